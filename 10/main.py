@@ -1,21 +1,44 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+import os
 import uvicorn
 
-app = FastAPI()
+from compression import DynamicGZipMiddleware, PrecompressedStaticFiles, static_url_factory
+from persistence import Journal
+from profiler import init_profiler
+from store import TaskStore
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    tasks.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Профилировщик регистрируется до gzip, чтобы gzip оборачивал и его ответы.
+init_profiler(app)
+app.add_middleware(DynamicGZipMiddleware, minimum_size=int(os.environ.get("COMPRESS_MIN_SIZE", 1024)))
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory="static"), name="static")
 
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["static_url"] = static_url_factory("static")
 
-tasks = [
-    {"id": 1, "title": "Изучить Python", "completed": True},
-    {"id": 2, "title": "Изучить FastAPI", "completed": False},
-    {"id": 3, "title": "Создать Todo List", "completed": False}
-]
-next_id = 4
+# Без TASKS_10_DATA_DIR задачи живут только в памяти, как раньше. Префикс
+# свой у каждого приложения, чтобы их журналы не смешивались в одном каталоге.
+tasks = TaskStore({"title": "", "completed": False}, journal=Journal.from_env("TASKS_10_", "tasks_10"))
+
+# Примеры — только при первом запуске: если журнал что-то восстановил,
+# пустой список означает, что пользователь удалил задачи сам.
+if not tasks.restored and not len(tasks):
+    tasks.add(title="Изучить Python", completed=True)
+    tasks.add(title="Изучить FastAPI")
+    tasks.add(title="Создать Todo List")
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
@@ -23,44 +46,29 @@ async def home(request: Request):
 
 @app.get("/api/tasks")
 async def get_tasks():
-    return tasks
+    return list(tasks.all())
 
 @app.post("/api/tasks")
 async def create_task(request: Request):
-    global next_id
     data = await request.json()
 
     if not data.get("title"):
         return {"error": "Название обязательно"}
 
-    task = {
-        "id": next_id,
-        "title": data["title"],
-        "completed": False
-    }
-
-    tasks.append(task)
-    next_id += 1
-    return task
+    return tasks.add(title=data["title"])
 
 @app.put("/api/tasks/{task_id}")
 async def update_task(task_id: int, request: Request):
     data = await request.json()
 
-    for task in tasks:
-        if task["id"] == task_id:
-            if "title" in data:
-                task["title"] = data["title"]
-            if "completed" in data:
-                task["completed"] = data["completed"]
-            return task
-
-    return {"error": "Задача не найдена"}
+    task = tasks.update(task_id, data)
+    if task is None:
+        return {"error": "Задача не найдена"}
+    return task
 
 @app.delete("/api/tasks/{task_id}")
 async def delete_task(task_id: int):
-    global tasks
-    tasks = [task for task in tasks if task["id"] != task_id]
+    tasks.delete(task_id)
     return {"success": True}
 
 if __name__ == "__main__":
@@ -0,0 +1,168 @@
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, Optional, Set
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+TOKEN_HEADER = "X-Profiler-Token"
+PROFILE_HEADER = "X-Profile"
+MAX_SECONDS = 60
+DEFAULT_INTERVAL = 0.005
+
+# Листовые кадры потоков, которые просто ждут (блокировки, select, accept,
+# очередь): без include_idle такие стеки не попадают в профиль.
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("socket.py", "accept"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("_thread.py", "run"),
+}
+
+_busy = threading.Lock()
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    # Сэмплирующий профилировщик: раз в interval секунд снимает стеки всех
+    # потоков через sys._current_frames и считает одинаковые стеки. Результат —
+    # collapsed-формат («поток;кадр;кадр N»), который принимают flamegraph.pl
+    # и speedscope. Накладные расходы не зависят от числа вызовов в коде.
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, thread_ids: Optional[Iterable[int]] = None,
+                 include_idle: bool = False):
+        self.interval = interval
+        self.thread_ids: Optional[Set[int]] = set(thread_ids) if thread_ids is not None else None
+        self.include_idle = include_idle
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self, own: int):
+        names: Dict[int, str] = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (self.thread_ids is not None and ident not in self.thread_ids):
+                continue
+            code = frame.f_code
+            if not self.include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES:
+                continue
+
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            self._stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self, seconds: float) -> str:
+        own = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and not self._stop.is_set():
+            self._sample(own)
+            time.sleep(self.interval)
+        return self.collapsed()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, args=(MAX_SECONDS,), name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+
+def format_stats(profile: cProfile.Profile, limit: int = 60) -> str:
+    stream = io.StringIO()
+    pstats.Stats(profile, stream=stream).sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
+
+
+def is_authorized(request: Request, token: str) -> bool:
+    supplied = request.headers.get(TOKEN_HEADER, "")
+    return hmac.compare_digest(supplied.encode(), token.encode())
+
+
+def init_profiler(app: FastAPI, token: Optional[str] = None):
+    # Профилирование живого процесса без передеплоя. Включается только
+    # переменной PROFILER_TOKEN; без неё маршрута нет, заголовок игнорируется.
+    #   GET /debug/profile?seconds=N[&interval_ms=5][&idle=1] — сэмплы всех потоков,
+    #   включая поток event loop (сам обработчик синхронный и ждёт в пуле потоков);
+    #   заголовок X-Profile: sample | cprofile — профиль одного запроса вместо
+    #   его тела (исходный статус — в X-Profiled-Status). Обработчики async,
+    #   поэтому профилируется поток event loop: в профиль попадут и корутины
+    #   других запросов, выполнявшиеся в это время.
+    token = token if token is not None else os.environ.get("PROFILER_TOKEN")
+    if not token:
+        return
+
+    @app.get("/debug/profile", include_in_schema=False)
+    def debug_profile(request: Request, seconds: float = 10, interval_ms: float = DEFAULT_INTERVAL * 1000,
+                      idle: bool = False):
+        if not is_authorized(request, token):
+            return JSONResponse({"error": "Доступ запрещён"}, status_code=403)
+        if not 0 < seconds <= MAX_SECONDS or interval_ms <= 0:
+            return JSONResponse({"error": f"seconds должен быть в диапазоне (0, {MAX_SECONDS}]"}, status_code=400)
+
+        if not _busy.acquire(blocking=False):
+            return JSONResponse({"error": "Профилировщик занят"}, status_code=409)
+        try:
+            sampler = StackSampler(interval_ms / 1000, include_idle=idle)
+            body = sampler.run(seconds)
+        finally:
+            _busy.release()
+
+        return PlainTextResponse(body, headers={"X-Profile-Samples": str(sampler.samples)})
+
+    @app.middleware("http")
+    async def profile_request(request: Request, call_next):
+        mode = request.headers.get(PROFILE_HEADER)
+        if mode not in ("sample", "cprofile") or not is_authorized(request, token):
+            return await call_next(request)
+        if not _busy.acquire(blocking=False):
+            return JSONResponse({"error": "Профилировщик занят"}, status_code=409)
+
+        try:
+            if mode == "sample":
+                profiler = StackSampler(interval=0.001, thread_ids=[threading.get_ident()], include_idle=True)
+                profiler.start()
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+
+            try:
+                response = await call_next(request)
+                # Тело дочитывается внутри профиля: потоковый ответ формируется
+                # уже после возврата из call_next.
+                async for _ in response.body_iterator:
+                    pass
+            finally:
+                if isinstance(profiler, StackSampler):
+                    body = profiler.stop()
+                else:
+                    profiler.disable()
+                    body = format_stats(profiler)
+        finally:
+            _busy.release()
+
+        return PlainTextResponse(body, headers={"X-Profiled-Status": str(response.status_code)})
@@ -0,0 +1,153 @@
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+import uvicorn
+
+from async_database import AsyncDatabase
+from database import db
+from models import TaskCreate, TaskUpdate
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+adb = AsyncDatabase(db)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    adb.close()
+
+
+app = FastAPI(
+    title="Todo List API",
+    description="ASGI-версия API задач поверх асинхронного слоя БД",
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+
+def error(message: str, status_code: int, **extra) -> JSONResponse:
+    return JSONResponse({'error': message, **extra}, status_code=status_code)
+
+
+@app.exception_handler(RequestValidationError)
+async def validation_error(request: Request, exc: RequestValidationError):
+
+    details = [{
+        'field': '.'.join(str(loc) for loc in err['loc'] if loc != 'body'),
+        'message': err['msg'],
+        'type': err['type']
+    } for err in exc.errors()]
+    return error('Ошибка валидации', 400, details=details)
+
+
+@app.get("/tasks")
+async def get_tasks(limit: Optional[int] = None, cursor: Optional[str] = None):
+
+    if limit is None and cursor is None:
+        return await adb.get_all_tasks()
+
+    if limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return error(f'limit должен быть от 1 до {MAX_PAGE_SIZE}', 400)
+
+    try:
+        tasks, next_cursor = await adb.list_tasks(limit, cursor)
+    except ValueError as e:
+        return error(str(e), 400)
+
+    return {'tasks': tasks, 'next_cursor': next_cursor}
+
+
+@app.get("/tasks/search")
+async def search_tasks(q: str = '', limit: int = DEFAULT_PAGE_SIZE, offset: int = 0):
+
+    if not q:
+        return error('Необходим поисковый запрос', 400)
+    if not 1 <= limit <= MAX_PAGE_SIZE or offset < 0:
+        return error('Некорректные параметры пагинации', 400)
+
+    return await adb.search_tasks(q, limit=limit, offset=offset)
+
+
+@app.get("/tasks/{task_id}")
+async def get_task(task_id: int):
+
+    task = await adb.get_task_by_id(task_id)
+    if not task:
+        return error('Задача не найдена', 404)
+    return task
+
+
+@app.post("/tasks", status_code=201)
+async def create_task(task_data: TaskCreate):
+
+    new_task = await adb.create_task(
+        title=task_data.title,
+        description=task_data.description or ""
+    )
+    if not new_task:
+        return error('Ошибка создания задачи', 500)
+    return new_task
+
+
+@app.put("/tasks/{task_id}")
+async def update_task(task_id: int, update_data: TaskUpdate):
+
+    updated_task = await adb.update_task(task_id, **update_data.model_dump(exclude_unset=True))
+    if not updated_task:
+        return error('Задача не найдена', 404)
+    return updated_task
+
+
+@app.patch("/tasks/{task_id}")
+async def patch_task(task_id: int, update_data: TaskUpdate):
+
+    update_dict = update_data.model_dump(exclude_unset=True)
+    if not update_dict:
+        return error('Нет полей для обновления', 400)
+
+    updated_task = await adb.update_task(task_id, **update_dict)
+    if not updated_task:
+        return error('Задача не найдена', 404)
+    return updated_task
+
+
+@app.post("/tasks/{task_id}/toggle")
+async def toggle_task_completion(task_id: int):
+
+    toggled_task = await adb.toggle_task_completion(task_id)
+    if not toggled_task:
+        return error('Задача не найдена', 404)
+    return toggled_task
+
+
+@app.delete("/tasks/{task_id}")
+async def delete_task(task_id: int):
+
+    task = await adb.delete_task(task_id)
+    if not task:
+        return error('Задача не найдена', 404)
+    return {'result': 'Задача удалена', 'task': task}
+
+
+@app.delete("/tasks")
+async def delete_all_tasks():
+
+    deleted_count = await adb.delete_all_tasks()
+    return {'result': 'Все задачи удалены', 'count': deleted_count}
+
+
+@app.get("/stats")
+async def get_stats():
+
+    return await adb.get_stats()
+
+
+if __name__ == "__main__":
+    uvicorn.run("asgi:app", host="0.0.0.0", port=2001)
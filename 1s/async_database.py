@@ -0,0 +1,67 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+from database import Database
+
+
+class AsyncDatabase:
+    # Асинхронная обёртка над Database с той же поверхностью методов.
+    # Чтения идут в ограниченный пул потоков (у каждого потока своё
+    # соединение из пула Database), все записи — в единственный поток-писатель,
+    # поэтому писатели SQLite не конкурируют друг с другом за блокировку.
+
+    def __init__(self, database: Database, max_readers: int = 8):
+        self.database = database
+        self._readers = ThreadPoolExecutor(max_workers=max_readers, thread_name_prefix="db-read")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+
+    async def _read(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, partial(method, *args, **kwargs))
+
+    async def _write(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, partial(method, *args, **kwargs))
+
+    async def get_all_tasks(self) -> List[Dict[str, Any]]:
+        return await self._read(self.database.get_all_tasks)
+
+    async def list_tasks(self, limit: int = 50,
+                         cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        return await self._read(self.database.list_tasks, limit, cursor)
+
+    async def get_task_by_id(self, task_id: int) -> Optional[Dict[str, Any]]:
+        return await self._read(self.database.get_task_by_id, task_id)
+
+    async def search_tasks(self, keyword: str, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        return await self._read(self.database.search_tasks, keyword, limit=limit, offset=offset)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        return await self._read(self.database.get_stats)
+
+    async def get_version(self) -> Tuple[int, int]:
+        return await self._read(self.database.get_version)
+
+    async def create_task(self, title: str, description: str = "") -> Optional[Dict[str, Any]]:
+        return await self._write(self.database.create_task, title, description)
+
+    async def update_task(self, task_id: int, **kwargs) -> Optional[Dict[str, Any]]:
+        return await self._write(self.database.update_task, task_id, **kwargs)
+
+    async def toggle_task_completion(self, task_id: int) -> Optional[Dict[str, Any]]:
+        return await self._write(self.database.toggle_task_completion, task_id)
+
+    async def delete_task(self, task_id: int) -> Optional[Dict[str, Any]]:
+        return await self._write(self.database.delete_task, task_id)
+
+    async def delete_all_tasks(self) -> int:
+        return await self._write(self.database.delete_all_tasks)
+
+    async def bulk_apply(self, operations) -> List[Dict[str, Any]]:
+        return await self._write(self.database.bulk_apply, operations)
+
+    def close(self):
+        self._readers.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
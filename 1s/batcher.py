@@ -0,0 +1,108 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Tuple
+
+from database import is_busy_error
+
+logger = logging.getLogger(__name__)
+
+Operation = Callable[[sqlite3.Connection], Any]
+
+_STOP = object()
+
+
+class WriteBatcher:
+    # Групповой коммит: операции записи копятся в очереди, и единственный
+    # поток-писатель выполняет до max_batch из них (или всё, что пришло за
+    # max_delay секунд) в одной транзакции — один fsync на пачку вместо
+    # одного на запись. Каждая операция обёрнута в SAVEPOINT, поэтому ошибка
+    # одной из них не откатывает соседей. Вызывающий ждёт свой Future.
+
+    def __init__(self, database, max_batch: int = 256, max_delay: float = 0.005,
+                 synchronous: str = "NORMAL"):
+        self.database = database
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.synchronous = synchronous
+        self.batches = 0
+        self.operations = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="db-batch-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, operation: Operation) -> Future:
+        future: Future = Future()
+        self._queue.put((operation, future))
+        return future
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch: List[Tuple[Operation, Future]]):
+        def apply(conn):
+            # synchronous задаёт компромисс между скоростью и надёжностью
+            # только для соединения писателя: FULL — fsync на каждый групповой
+            # коммит. Ставится на каждую пачку: пул может переоткрыть
+            # соединение (простой, проверка здоровья) с настройками профиля.
+            conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+            conn.execute("BEGIN IMMEDIATE")
+            outcomes = []
+            for operation, _ in batch:
+                conn.execute("SAVEPOINT batch_op")
+                try:
+                    outcomes.append((True, operation(conn)))
+                    conn.execute("RELEASE batch_op")
+                except sqlite3.Error as e:
+                    if isinstance(e, sqlite3.OperationalError) and is_busy_error(e):
+                        raise
+                    conn.execute("ROLLBACK TO batch_op")
+                    conn.execute("RELEASE batch_op")
+                    outcomes.append((False, e))
+            return outcomes
+
+        try:
+            outcomes = self.database._write(apply)
+        except Exception as e:
+            logger.error(f"Ошибка группового коммита: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.operations += len(batch)
+        for (_, future), (ok, value) in zip(batch, outcomes):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
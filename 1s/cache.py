@@ -0,0 +1,173 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple
+
+from database import Database
+
+class CacheBackend(Protocol):
+    # Минимальный протокол хранилища кэша. Его покрывает и локальный
+    # LRUCache, и тонкий адаптер над общим хранилищем (Redis/memcached)
+    # для нескольких воркеров: значения — JSON-совместимые dict/list.
+
+    def get(self, key: str) -> Optional[Any]: ...
+
+    def set(self, key: str, value: Any, ttl: float) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+def estimate_size(value: Any) -> int:
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+class LRUCache:
+    # Локальный LRU с бюджетом по памяти (оценка через sys.getsizeof) и TTL.
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, size, expires_at = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic() + ttl)
+            self.bytes += size
+
+            while self.bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class CachedDatabase:
+    # Read-through кэш перед Database. Все ключи включают версию таблицы
+    # tasks из table_versions — ту же, что отдаётся в ETag. Версию меняют
+    # триггеры в транзакции записи, поэтому она общая для всех воркеров,
+    # работающих с файлом: запись в одном процессе делает недостижимыми
+    # записи кэша во всех остальных. Устаревшие ключи вытесняет LRU.
+    # Остальные методы Database проксируются без изменений.
+    #
+    # version — откуда брать версию: приложение передаёт уже прочитанную
+    # для запроса (её же conditional_get отдаёт в ETag), чтобы попадание
+    # в кэш не стоило отдельного запроса к SQLite.
+
+    def __init__(self, database: Database, backend: Optional[CacheBackend] = None, ttl: float = 30.0,
+                 version: Optional[Callable[[], int]] = None):
+        self.database = database
+        self.backend = backend if backend is not None else LRUCache()
+        self.ttl = ttl
+        self.version = version if version is not None else lambda: self.database.get_version()[0]
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        return getattr(self.database, name)
+
+    def _read_through(self, key: str, load):
+        version = self.version()
+        if not version:
+            # Версию прочитать не удалось — кэшу не на что опереться.
+            return load()
+
+        key = f"{version}:{key}"
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        # Данные читаются после версии, поэтому под ключом версии может
+        # оказаться только то же или более новое состояние, но не старое.
+        value = load()
+        if value is not None:
+            self.backend.set(key, value, self.ttl)
+        return value
+
+    def get_task_by_id(self, task_id: int) -> Optional[Dict[str, Any]]:
+        return self._read_through(f"task:{task_id}", lambda: self.database.get_task_by_id(task_id))
+
+    def get_all_tasks(self) -> List[Dict[str, Any]]:
+        return self._read_through("tasks:all", self.database.get_all_tasks)
+
+    def get_all_tasks_json(self) -> str:
+        return self._read_through("tasks:all.json", self.database.get_all_tasks_json)
+
+    def list_tasks(self, limit: int = 50,
+                   cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        page = self._read_through(f"tasks:page:{limit}:{cursor or ''}",
+                                  lambda: list(self.database.list_tasks(limit, cursor)))
+        return page[0], page[1]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self._read_through("stats", self.database.get_stats)
+
+    def stats(self) -> Dict[str, Any]:
+        backend_stats = self.backend.stats() if hasattr(self.backend, "stats") else {}
+        return {
+            **backend_stats,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
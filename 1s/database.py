@@ -1,58 +1,534 @@
+import base64
+import html
+import json
+import os
+import random
+import re
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, Tuple
 import logging
 
+from events import ChangeFeed
+from query_profiler import ProfilingConnection, QueryProfiler
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-class Database:
-    def __init__(self, db_path: str = "todo.db"):
+class StorageProfile:
+    # Настройки SQLite, применяемые к каждому новому соединению пула.
+    # Значения по умолчанию рассчитаны на несколько процессов-воркеров:
+    # WAL позволяет читателям не ждать писателя, busy_timeout и повторы
+    # с backoff сглаживают конкуренцию писателей.
+    #
+    # slow_query_ms >= 0 включает профилирование выражений (QueryProfiler):
+    # лог медленных запросов и EXPLAIN QUERY PLAN для новых форм.
+
+    def __init__(self, journal_mode: str = "WAL", synchronous: str = "NORMAL",
+                 mmap_size: int = 256 * 1024 * 1024, cache_size: int = -16000,
+                 temp_store: str = "MEMORY", busy_timeout: int = 5000,
+                 busy_retries: int = 5, busy_backoff: float = 0.05,
+                 slow_query_ms: float = -1.0):
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.temp_store = temp_store
+        self.busy_timeout = busy_timeout
+        self.busy_retries = busy_retries
+        self.busy_backoff = busy_backoff
+        self.slow_query_ms = slow_query_ms
+
+    @classmethod
+    def from_env(cls, prefix: str = "TODO_DB_") -> "StorageProfile":
+        profile = cls()
+        for name, value in vars(profile).items():
+            raw = os.environ.get(prefix + name.upper())
+            if raw is not None:
+                setattr(profile, name, type(value)(raw))
+        return profile
+
+    def apply(self, conn: sqlite3.Connection):
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        conn.execute(f"PRAGMA temp_store = {self.temp_store}")
+
+
+def encode_cursor(task: Dict[str, Any]) -> str:
+    key = [int(task["completed"]), task["created_at"], task["id"]]
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[int, str, int]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        completed, created_at, task_id = json.loads(base64.urlsafe_b64decode(padded))
+        return int(completed), str(created_at), int(task_id)
+    except (ValueError, TypeError):
+        raise ValueError("Некорректный курсор")
+
+
+def is_busy_error(error: sqlite3.Error) -> bool:
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+class _PooledConnection:
+
+    __slots__ = ("conn", "depth", "last_used", "last_checked")
+
+    def __init__(self, conn: sqlite3.Connection, now: float):
+        self.conn = conn
+        self.depth = 0
+        self.last_used = now
+        self.last_checked = now
+
+
+class ConnectionPool:
+    # Одно «тёплое» соединение на поток: кэш подготовленных выражений и
+    # разобранная схема переживают запрос. Соединения простаивающих или
+    # завершившихся потоков закрываются при периодической чистке.
+
+    def __init__(self, db_path: str, profile: Optional[StorageProfile] = None,
+                 max_idle: float = 300.0, health_check_interval: float = 30.0,
+                 cached_statements: int = 256, profiler: Optional[QueryProfiler] = None):
         self.db_path = db_path
-        self.init_db()
-
-    def get_connection(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path)
+        self.profile = profile or StorageProfile()
+        self.max_idle = max_idle
+        self.health_check_interval = health_check_interval
+        self.cached_statements = cached_statements
+        self.profiler = profiler
+        self._lock = threading.Lock()
+        self._slots: Dict[int, _PooledConnection] = {}
+        self._last_sweep = time.monotonic()
+
+    def _connect(self) -> sqlite3.Connection:
+        # check_same_thread=False только ради закрытия из чистки: соединение
+        # используется исключительно потоком-владельцем.
+        factory = ProfilingConnection if self.profiler is not None else sqlite3.Connection
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               cached_statements=self.cached_statements, factory=factory)
+        if self.profiler is not None:
+            conn.profiler = self.profiler
         conn.row_factory = sqlite3.Row
+        self.profile.apply(conn)
         return conn
 
-    def init_db(self):
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
 
+    def _acquire(self) -> _PooledConnection:
+        ident = threading.get_ident()
+        now = time.monotonic()
+
+        with self._lock:
+            slot = self._slots.get(ident)
+            if slot is not None and slot.depth == 0:
+                if now - slot.last_used > self.max_idle:
+                    slot.conn.close()
+                    slot = None
+                elif now - slot.last_checked > self.health_check_interval:
+                    slot.last_checked = now
+                    if not self._is_healthy(slot.conn):
+                        logger.warning("Соединение с БД не прошло проверку, переподключение")
+                        slot.conn.close()
+                        slot = None
+
+            if slot is None:
+                slot = _PooledConnection(self._connect(), now)
+                self._slots[ident] = slot
+
+            slot.depth += 1
+            slot.last_used = now
+
+        if now - self._last_sweep > self.max_idle:
+            self.evict_idle()
+        return slot
+
+    def _release(self, slot: _PooledConnection):
+        with self._lock:
+            slot.depth -= 1
+            slot.last_used = time.monotonic()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        slot = self._acquire()
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
+            with slot.conn:
+                yield slot.conn
+        finally:
+            self._release(slot)
+
+    def get(self) -> sqlite3.Connection:
+        slot = self._acquire()
+        self._release(slot)
+        return slot.conn
+
+    def evict_idle(self) -> int:
+        now = time.monotonic()
+        alive = {thread.ident for thread in threading.enumerate()}
+        evicted = 0
+
+        with self._lock:
+            self._last_sweep = now
+            for ident, slot in list(self._slots.items()):
+                if slot.depth:
+                    continue
+                if ident not in alive or now - slot.last_used > self.max_idle:
+                    slot.conn.close()
+                    del self._slots[ident]
+                    evicted += 1
+        return evicted
+
+    def close_all(self):
+        with self._lock:
+            for slot in self._slots.values():
+                slot.conn.close()
+            self._slots.clear()
 
-                cursor.execute('''
-                CREATE TABLE IF NOT EXISTS tasks (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    description TEXT DEFAULT '',
-                    completed BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-                ''')
+    @property
+    def size(self) -> int:
+        return len(self._slots)
 
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks(completed)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_created ON tasks(created_at)')
 
-                conn.commit()
-                logger.info("✅ База данных инициализирована")
+TASK_COLUMNS = ("id", "title", "description", "completed", "created_at", "updated_at")
 
-                cursor.execute("SELECT COUNT(*) as count FROM tasks")
-                count = cursor.fetchone()["count"]
+# Версия схемы в PRAGMA user_version. Увеличивается при любом изменении
+# DDL в _create_schema; совпадение означает, что миграции уже применены.
+SCHEMA_VERSION = 1
 
-                if count == 0:
-                    self._add_sample_data(cursor)
-                    conn.commit()
-                    logger.info("✅ Добавлены тестовые данные")
 
+# Границы совпадений в highlight()/snippet(): управляющие символы, которых
+# нет в тексте задач, заменяются на <mark> уже после экранирования HTML.
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+
+
+def mark_matches(text: Optional[str]) -> Optional[str]:
+    if text is None:
+        return None
+    return html.escape(text).replace(MATCH_START, "<mark>").replace(MATCH_END, "</mark>")
+
+
+def json_object_sql(columns) -> str:
+    return "json_object(" + ", ".join(f"'{column}', {column}" for column in columns) + ")"
+
+
+class Database:
+    def __init__(self, db_path: str = "todo.db", profile: Optional[StorageProfile] = None,
+                 max_idle: float = 300.0):
+        self.db_path = db_path
+        self.profile = profile or StorageProfile.from_env()
+        self.query_profiler = None
+        if self.profile.slow_query_ms >= 0:
+            self.query_profiler = QueryProfiler(self.profile.slow_query_ms)
+        self.pool = ConnectionPool(db_path, self.profile, max_idle=max_idle,
+                                   profiler=self.query_profiler)
+        self.busy_retries = 0
+        self.fts_enabled = False
+        self.changes = ChangeFeed()
+        self.batcher = None
+        # Схема проверяется при первом обращении, а не в конструкторе:
+        # импорт модуля и форк воркера не трогают файл БД.
+        self._ready = False
+        self._init_lock = threading.Lock()
+
+    def _ensure_ready(self):
+        if not self._ready:
+            self.init_db()
+
+    def get_connection(self) -> sqlite3.Connection:
+        self._ensure_ready()
+        return self.pool.get()
+
+    def connection(self):
+        self._ensure_ready()
+        return self.pool.connection()
+
+    def close(self):
+        if self.batcher is not None:
+            self.batcher.close()
+            self.batcher = None
+        self.pool.close_all()
+        if self.query_profiler is not None:
+            for entry in self.query_profiler.report(limit=10):
+                logger.info(f"Профиль запросов: {entry}")
+
+    def enable_write_batching(self, max_batch: int = 256, max_delay: float = 0.005,
+                              synchronous: str = "NORMAL"):
+        from batcher import WriteBatcher
+
+        if self.batcher is None:
+            self.batcher = WriteBatcher(self, max_batch=max_batch, max_delay=max_delay,
+                                        synchronous=synchronous)
+
+    def _execute_write(self, operation):
+        # Одиночные изменения задач: через групповой коммит, если он включён.
+        if self.batcher is not None:
+            return self.batcher.submit(operation).result()
+        return self._write(operation)
+
+    def _change_state(self, cursor) -> Dict[str, Any]:
+        # Статистика и версия таблицы читаются в той же транзакции, что и
+        # изменение: отдельный запрос после коммита мог бы вернуть уже чужую,
+        # более позднюю запись. По версии поток SSE замечает изменения,
+        # сделанные другими процессами.
+        row = cursor.execute("SELECT version FROM table_versions WHERE name = 'tasks'").fetchone()
+        return {"stats": self._read_stats(cursor), "version": row["version"]}
+
+    def _notify(self, changes: List[Tuple[str, Optional[Dict[str, Any]]]], state: Dict[str, Any]):
+        if not changes:
+            return
+        for event_type, task in changes:
+            data = dict(state)
+            if task is not None:
+                data["task"] = task
+            self.changes.publish(event_type, data)
+
+    def _write(self, operation):
+        self._ensure_ready()
+        return self._write_with_retry(operation)
+
+    def _write_with_retry(self, operation):
+        # Повтор всей транзакции при SQLITE_BUSY: busy_timeout не спасает,
+        # когда отложенная транзакция уже прочитала устаревший снимок WAL.
+        attempt = 0
+        while True:
+            try:
+                with self.pool.connection() as conn:
+                    return operation(conn)
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e) or attempt >= self.profile.busy_retries:
+                    raise
+                delay = self.profile.busy_backoff * (2 ** attempt)
+                attempt += 1
+                self.busy_retries += 1
+                logger.warning(f"БД занята, повтор {attempt} через {delay:.3f} с")
+                time.sleep(delay * random.uniform(0.5, 1.5))
+
+    def init_db(self):
+        with self._init_lock:
+            if self._ready:
+                return
+            try:
+                self._write_with_retry(self._migrate)
+            except sqlite3.Error as e:
+                logger.error(f"❌ Ошибка инициализации БД: {e}")
+                raise
+            self._ready = True
+
+    def _migrate(self, conn):
+        cursor = conn.cursor()
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            if version > SCHEMA_VERSION:
+                logger.warning(f"Схема БД версии {version} новее ожидаемой {SCHEMA_VERSION}")
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'")
+            self.fts_enabled = cursor.fetchone() is not None
+            return
+
+        # BEGIN IMMEDIATE: воркеры, стартующие одновременно, применяют
+        # миграции по очереди, и второй увидит уже новую версию.
+        conn.execute("BEGIN IMMEDIATE")
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            self._create_schema(cursor)
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        else:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'")
+            self.fts_enabled = cursor.fetchone() is not None
+        conn.commit()
+        logger.info(f"✅ База данных инициализирована (схема версии {SCHEMA_VERSION})")
+
+    def _create_schema(self, cursor):
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT DEFAULT '',
+            completed BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks(completed)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_created ON tasks(created_at)')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tasks_order
+        ON tasks(completed, created_at DESC, id DESC)
+        ''')
+        self._ensure_fts(cursor)
+        self._ensure_stats(cursor)
+        self._ensure_versions(cursor)
+
+    def _ensure_fts(self, cursor):
+        # Миграция: внешний FTS5-индекс по title/description, синхронизация
+        # триггерами и однократное заполнение уже существующих строк.
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'")
+        if cursor.fetchone():
+            self.fts_enabled = True
+            return
+
+        try:
+            cursor.execute('''
+            CREATE VIRTUAL TABLE tasks_fts USING fts5(
+                title, description,
+                content='tasks', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+            ''')
+        except sqlite3.OperationalError as e:
+            self.fts_enabled = False
+            logger.warning(f"FTS5 недоступен, поиск через LIKE: {e}")
+            return
+
+        cursor.execute('''
+        CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts(rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+        ''')
+        cursor.execute('''
+        CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+        ''')
+        cursor.execute('''
+        CREATE TRIGGER tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO tasks_fts(rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+        ''')
+        # Совпадение в названии весит больше, чем в описании.
+        cursor.execute("INSERT INTO tasks_fts(tasks_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+        cursor.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+        self.fts_enabled = True
+        logger.info("✅ Создан полнотекстовый индекс задач")
+
+    def _ensure_stats(self, cursor):
+        # Материализованная строка статистики: триггеры поддерживают счётчики
+        # в той же транзакции, что и изменение задач, поэтому /stats читает
+        # одну строку вместо агрегации по всей таблице.
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'task_stats'")
+        if cursor.fetchone():
+            return
+
+        cursor.execute('''
+        CREATE TABLE task_stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0
+        )
+        ''')
+        cursor.execute('''
+        CREATE TRIGGER task_stats_insert AFTER INSERT ON tasks BEGIN
+            UPDATE task_stats
+            SET total = total + 1,
+                completed = completed + (CASE WHEN new.completed = 1 THEN 1 ELSE 0 END)
+            WHERE id = 1;
+        END
+        ''')
+        cursor.execute('''
+        CREATE TRIGGER task_stats_delete AFTER DELETE ON tasks BEGIN
+            UPDATE task_stats
+            SET total = total - 1,
+                completed = completed - (CASE WHEN old.completed = 1 THEN 1 ELSE 0 END)
+            WHERE id = 1;
+        END
+        ''')
+        cursor.execute('''
+        CREATE TRIGGER task_stats_update AFTER UPDATE OF completed ON tasks BEGIN
+            UPDATE task_stats
+            SET completed = completed
+                + (CASE WHEN new.completed = 1 THEN 1 ELSE 0 END)
+                - (CASE WHEN old.completed = 1 THEN 1 ELSE 0 END)
+            WHERE id = 1;
+        END
+        ''')
+        self._recompute_stats(cursor)
+
+    @staticmethod
+    def _recompute_stats(cursor):
+        cursor.execute("""
+            INSERT OR REPLACE INTO task_stats (id, total, completed)
+            SELECT 1, COUNT(*), COALESCE(SUM(CASE WHEN completed = 1 THEN 1 ELSE 0 END), 0)
+            FROM tasks
+        """)
+
+    def _ensure_versions(self, cursor):
+        # Счётчик версий таблицы tasks для ETag/Last-Modified. Живёт в самой
+        # БД, поэтому одинаков для всех воркеров, работающих с файлом.
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'table_versions'")
+        if cursor.fetchone():
+            return
+
+        cursor.execute('''
+        CREATE TABLE table_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            modified_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+        ''')
+        # Начальная версия от текущего времени: после пересоздания файла БД
+        # старые ETag клиентов не совпадут с новыми.
+        cursor.execute("""
+            INSERT INTO table_versions (name, version)
+            VALUES ('tasks', CAST(strftime('%s', 'now') AS INTEGER) * 1000)
+        """)
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f'''
+            CREATE TRIGGER tasks_version_{event.lower()} AFTER {event} ON tasks BEGIN
+                UPDATE table_versions
+                SET version = version + 1,
+                    modified_at = CAST(strftime('%s', 'now') AS INTEGER)
+                WHERE name = 'tasks';
+            END
+            ''')
+
+    @staticmethod
+    def _bump_version(cursor):
+        cursor.execute("""
+            UPDATE table_versions
+            SET version = version + 1,
+                modified_at = CAST(strftime('%s', 'now') AS INTEGER)
+            WHERE name = 'tasks'
+        """)
+
+    def get_version(self) -> Tuple[int, int]:
+
+        try:
+            with self.connection() as conn:
+                row = conn.execute(
+                    "SELECT version, modified_at FROM table_versions WHERE name = 'tasks'"
+                ).fetchone()
+                return row["version"], row["modified_at"]
         except sqlite3.Error as e:
-            logger.error(f"❌ Ошибка инициализации БД: {e}")
-            raise
+            logger.error(f"Ошибка получения версии таблицы: {e}")
+            return 0, 0
 
-    def _add_sample_data(self, cursor):
+    def seed_sample_data(self) -> int:
+        # Демонстрационные задачи добавляются только явной командой
+        # (flask --app main1s seed-db) и только в пустую таблицу.
 
         sample_tasks = [
             ("Изучить Python", "Пройти курс по Python и Flask", True),
@@ -62,15 +538,24 @@ class Database:
             ("Написать документацию", "Описать API endpoints", False)
         ]
 
-        cursor.executemany(
-            "INSERT INTO tasks (title, description, completed) VALUES (?, ?, ?)",
-            sample_tasks
-        )
+        def seed(conn):
+            if conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]:
+                return 0
+            conn.executemany(
+                "INSERT INTO tasks (title, description, completed) VALUES (?, ?, ?)",
+                sample_tasks
+            )
+            return len(sample_tasks)
+
+        added = self._write(seed)
+        if added:
+            logger.info("✅ Добавлены тестовые данные")
+        return added
 
     def get_all_tasks(self) -> List[Dict[str, Any]]:
 
         try:
-            with self.get_connection() as conn:
+            with self.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT id, title, description, completed, 
@@ -83,10 +568,107 @@ class Database:
             logger.error(f"Ошибка получения задач: {e}")
             return []
 
+    def iter_tasks(self, batch_size: int = 500) -> Iterator[List[Dict[str, Any]]]:
+        # Выгрузка пачками через fetchmany: в памяти одновременно не больше
+        # batch_size строк, сколько бы задач ни было в таблице.
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, title, description, completed, 
+                       created_at, updated_at 
+                FROM tasks 
+                ORDER BY completed, created_at DESC, id DESC
+            """)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [dict(row) for row in rows]
+
+    def get_all_tasks_json(self) -> str:
+        # Тот же список, что get_all_tasks, но JSON собирает сам SQLite
+        # (json_object + json_group_array): в Python не создаётся ни Row, ни
+        # dict на задачу. Ключи отсортированы, как в ответах jsonify.
+        try:
+            with self.connection() as conn:
+                row = conn.execute(f"""
+                    SELECT json_group_array(json(task)) FROM (
+                        SELECT {json_object_sql(sorted(TASK_COLUMNS))} AS task
+                        FROM tasks
+                        ORDER BY completed, created_at DESC
+                    )
+                """).fetchone()
+                return row[0]
+        except sqlite3.Error as e:
+            logger.warning(f"JSON-функции SQLite недоступны, сериализация в Python: {e}")
+            return json.dumps(self.get_all_tasks(), ensure_ascii=False, sort_keys=True,
+                              separators=(",", ":"))
+
+    def iter_tasks_json(self, batch_size: int = 500) -> Iterator[List[str]]:
+        # Потоковый аналог iter_tasks: строка выгрузки — готовый JSON-объект.
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT {json_object_sql(TASK_COLUMNS)}
+                FROM tasks 
+                ORDER BY completed, created_at DESC, id DESC
+            """)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [row[0] for row in rows]
+
+    def list_tasks(self, limit: int = 50,
+                   cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        # Keyset-пагинация в порядке (completed, created_at DESC, id DESC).
+        # completed принимает только 0 и 1, поэтому страница собирается из
+        # не более чем двух диапазонов индекса idx_tasks_order.
+        after = decode_cursor(cursor) if cursor else None
+        tasks: List[Dict[str, Any]] = []
+
+        try:
+            with self.connection() as conn:
+                for completed in (0, 1):
+                    if after and completed < after[0]:
+                        continue
+
+                    wanted = limit + 1 - len(tasks)
+                    if after and completed == after[0]:
+                        rows = conn.execute("""
+                            SELECT id, title, description, completed, 
+                                   created_at, updated_at 
+                            FROM tasks 
+                            WHERE completed = ? AND (created_at, id) < (?, ?)
+                            ORDER BY created_at DESC, id DESC
+                            LIMIT ?
+                        """, (completed, after[1], after[2], wanted))
+                    else:
+                        rows = conn.execute("""
+                            SELECT id, title, description, completed, 
+                                   created_at, updated_at 
+                            FROM tasks 
+                            WHERE completed = ?
+                            ORDER BY created_at DESC, id DESC
+                            LIMIT ?
+                        """, (completed, wanted))
+
+                    tasks.extend(dict(row) for row in rows)
+                    if len(tasks) > limit:
+                        break
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка получения страницы задач: {e}")
+            return [], None
+
+        if len(tasks) > limit:
+            tasks = tasks[:limit]
+            return tasks, encode_cursor(tasks[-1])
+        return tasks, None
+
     def get_task_by_id(self, task_id: int) -> Optional[Dict[str, Any]]:
 
         try:
-            with self.get_connection() as conn:
+            with self.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT id, title, description, completed, 
@@ -101,148 +683,336 @@ class Database:
 
     def create_task(self, title: str, description: str = "") -> Optional[Dict[str, Any]]:
 
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO tasks (title, description) 
-                    VALUES (?, ?)
-                """, (title, description))
-                conn.commit()
+        def insert(conn):
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO tasks (title, description) 
+                VALUES (?, ?)
+                RETURNING id, title, description, completed, created_at, updated_at
+            """, (title, description))
+            task = dict(cursor.fetchone())
+            return task, self._change_state(cursor)
 
-                task_id = cursor.lastrowid
-                return self.get_task_by_id(task_id)
+        try:
+            task, state = self._execute_write(insert)
         except sqlite3.Error as e:
             logger.error(f"Ошибка создания задачи: {e}")
             return None
 
-    def update_task(self, task_id: int, **kwargs) -> Optional[Dict[str, Any]]:
-
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
+        self._notify([("created", task)], state)
+        return task
 
-                set_clauses = []
-                values = []
+    def update_task(self, task_id: int, **kwargs) -> Optional[Dict[str, Any]]:
 
-                allowed_fields = ["title", "description", "completed"]
-                for key, value in kwargs.items():
-                    if key in allowed_fields and value is not None:
-                        set_clauses.append(f"{key} = ?")
-                        values.append(value)
+        set_clauses = []
+        values = []
 
-                if not set_clauses:
-                    return None
+        allowed_fields = ["title", "description", "completed"]
+        for key, value in kwargs.items():
+            if key in allowed_fields and value is not None:
+                set_clauses.append(f"{key} = ?")
+                values.append(value)
 
-                set_clauses.append("updated_at = CURRENT_TIMESTAMP")
-                values.append(task_id)
+        if not set_clauses:
+            return None
 
-                sql = f"UPDATE tasks SET {', '.join(set_clauses)} WHERE id = ?"
-                cursor.execute(sql, values)
-                conn.commit()
+        set_clauses.append("updated_at = CURRENT_TIMESTAMP")
+        values.append(task_id)
+
+        def update(conn):
+            cursor = conn.cursor()
+            sql = f"""
+                UPDATE tasks SET {', '.join(set_clauses)} WHERE id = ?
+                RETURNING id, title, description, completed, created_at, updated_at
+            """
+            cursor.execute(sql, values)
+            row = cursor.fetchone()
+            if not row:
+                return None, None
+            task = dict(row)
+            return task, self._change_state(cursor)
 
-                return self.get_task_by_id(task_id) if cursor.rowcount > 0 else None
+        try:
+            task, state = self._execute_write(update)
         except sqlite3.Error as e:
             logger.error(f"Ошибка обновления задачи {task_id}: {e}")
             return None
 
-    def delete_task(self, task_id: int) -> bool:
+        if task:
+            self._notify([("updated", task)], state)
+        return task
+
+    def delete_task(self, task_id: int) -> Optional[Dict[str, Any]]:
+
+        def delete(conn):
+            cursor = conn.cursor()
+            cursor.execute("""
+                DELETE FROM tasks WHERE id = ?
+                RETURNING id, title, description, completed, created_at, updated_at
+            """, (task_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None, None
+            task = dict(row)
+            return task, self._change_state(cursor)
 
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
-                conn.commit()
-                return cursor.rowcount > 0
+            task, state = self._execute_write(delete)
         except sqlite3.Error as e:
             logger.error(f"Ошибка удаления задачи {task_id}: {e}")
-            return False
+            return None
+
+        if task:
+            self._notify([("deleted", task)], state)
+        return task
+
+    BULK_CHUNK = 500
+
+    def _fetch_by_ids(self, cursor, ids) -> Dict[int, Dict[str, Any]]:
+        ids = list(ids)
+        found = {}
+        for start in range(0, len(ids), self.BULK_CHUNK):
+            chunk = ids[start:start + self.BULK_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(f"""
+                SELECT id, title, description, completed, 
+                       created_at, updated_at 
+                FROM tasks WHERE id IN ({placeholders})
+            """, chunk)
+            found.update((row["id"], dict(row)) for row in cursor.fetchall())
+        return found
+
+    def bulk_apply(self, operations: List[Tuple[str, Optional[int], Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        # Операции выполняются по порядку в одной транзакции; подряд идущие
+        # однотипные операции (для update — с одинаковым набором полей)
+        # отправляются одним executemany.
+        allowed_fields = ["title", "description", "completed"]
+
+        def apply(conn):
+            # BEGIN IMMEDIATE до проверки существующих id: иначе между
+            # проверкой и неявным BEGIN первого изменения другой процесс
+            # успевает удалить или добавить задачи.
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.cursor()
+            results: List[Dict[str, Any]] = [{} for _ in operations]
+            existing = set(self._fetch_by_ids(cursor, {
+                task_id for kind, task_id, _ in operations if kind != "create"
+            }))
+            touched = set()
+
+            def run_key(kind, fields):
+                if kind == "update":
+                    return kind, tuple(k for k in allowed_fields if fields.get(k) is not None)
+                return kind, None
+
+            start = 0
+            while start < len(operations):
+                kind, _, fields = operations[start]
+                key = run_key(kind, fields)
+                end = start + 1
+                while end < len(operations) and run_key(operations[end][0], operations[end][2]) == key:
+                    end += 1
+                run = range(start, end)
+
+                if kind == "create":
+                    cursor.executemany(
+                        "INSERT INTO tasks (title, description) VALUES (?, ?)",
+                        [(operations[i][2]["title"], operations[i][2].get("description") or "") for i in run]
+                    )
+                    # AUTOINCREMENT под блокировкой записи выдаёт id подряд.
+                    last_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+                    for offset, i in enumerate(run):
+                        task_id = last_id - len(run) + 1 + offset
+                        existing.add(task_id)
+                        touched.add(task_id)
+                        results[i] = {"status": 201, "id": task_id}
+
+                elif kind == "update":
+                    columns = key[1]
+                    if not columns:
+                        for i in run:
+                            results[i] = {"status": 400, "id": operations[i][1],
+                                          "error": "Нет полей для обновления"}
+                    else:
+                        assignments = ", ".join(f"{column} = ?" for column in columns)
+                        cursor.executemany(
+                            f"UPDATE tasks SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                            [[operations[i][2][c] for c in columns] + [operations[i][1]] for i in run]
+                        )
+                        for i in run:
+                            task_id = operations[i][1]
+                            if task_id in existing:
+                                touched.add(task_id)
+                                results[i] = {"status": 200, "id": task_id}
+                            else:
+                                results[i] = {"status": 404, "id": task_id, "error": "Задача не найдена"}
+
+                else:
+                    cursor.executemany("DELETE FROM tasks WHERE id = ?",
+                                       [(operations[i][1],) for i in run])
+                    for i in run:
+                        task_id = operations[i][1]
+                        if task_id in existing:
+                            existing.discard(task_id)
+                            touched.discard(task_id)
+                            results[i] = {"status": 200, "id": task_id}
+                        else:
+                            results[i] = {"status": 404, "id": task_id, "error": "Задача не найдена"}
+
+                start = end
+
+            rows = self._fetch_by_ids(cursor, touched)
+            for (kind, _, _), result in zip(operations, results):
+                if kind != "delete" and result.get("id") in rows:
+                    result["task"] = rows[result["id"]]
+            state = self._change_state(cursor)
+            conn.commit()
+            return results, state
+
+        results, state = self._write(apply)
+
+        event_types = {"create": "created", "update": "updated", "delete": "deleted"}
+        self._notify([
+            (event_types[kind], result.get("task", {"id": result["id"]}))
+            for (kind, _, _), result in zip(operations, results)
+            if result["status"] < 400
+        ], state)
+        return results
 
     def delete_all_tasks(self) -> int:
 
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT COUNT(*) as count FROM tasks")
-                count_before = cursor.fetchone()["count"]
+        def delete_all(conn):
+            cursor = conn.cursor()
+            cursor.execute("SELECT total FROM task_stats WHERE id = 1")
+            count_before = cursor.fetchone()["total"]
+
+            cursor.execute("DELETE FROM tasks")
+            state = self._change_state(cursor)
+            conn.commit()
+            return count_before, state
 
-                cursor.execute("DELETE FROM tasks")
-                conn.commit()
-                return count_before
+        try:
+            count, state = self._write(delete_all)
         except sqlite3.Error as e:
             logger.error(f"Ошибка удаления всех задач: {e}")
             return 0
 
+        self._notify([("reset", None)], state)
+        return count
 
-    def get_stats(self) -> Dict[str, Any]:
 
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT 
-                        COUNT(*) as total,
-                        SUM(CASE WHEN completed = 1 THEN 1 ELSE 0 END) as completed,
-                        SUM(CASE WHEN completed = 0 THEN 1 ELSE 0 END) as active
-                    FROM tasks
-                """)
+    @staticmethod
+    def _read_stats(cursor) -> Dict[str, Any]:
+        cursor.execute("SELECT total, completed FROM task_stats WHERE id = 1")
 
-                stats = dict(cursor.fetchone())
-                total = stats["total"] or 0
-                completed = stats["completed"] or 0
+        stats = dict(cursor.fetchone())
+        total = stats["total"] or 0
+        completed = stats["completed"] or 0
 
-                stats["completion_rate"] = (completed / total * 100) if total > 0 else 0
-                return stats
+        stats["active"] = total - completed
+        stats["completion_rate"] = (completed / total * 100) if total > 0 else 0
+        return stats
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        try:
+            with self.connection() as conn:
+                return self._read_stats(conn.cursor())
         except sqlite3.Error as e:
             logger.error(f"Ошибка получения статистики: {e}")
             return {"total": 0, "completed": 0, "active": 0, "completion_rate": 0}
 
-    def search_tasks(self, keyword: str) -> List[Dict[str, Any]]:
+    def recompute_stats(self) -> Dict[str, Any]:
+        # Полный проход по tasks под блокировкой записи — операция
+        # обслуживания для CLI. Версия таблицы растёт, чтобы сбросить кэши.
+
+        def recompute(conn):
+            cursor = conn.cursor()
+            self._recompute_stats(cursor)
+            self._bump_version(cursor)
+            return self._read_stats(cursor)
+
+        return self._write(recompute)
+
+    @staticmethod
+    def _fts_query(keyword: str) -> str:
+        # Каждое слово — отдельный префиксный терм в кавычках, поэтому
+        # спецсимволы синтаксиса FTS5 из пользовательского ввода не опасны.
+        return " ".join(f'"{word}"*' for word in re.findall(r"\w+", keyword))
+
+    def search_tasks(self, keyword: str, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
 
         try:
             if not keyword.strip():
                 return self.get_all_tasks()
 
-            with self.get_connection() as conn:
+            with self.connection() as conn:
                 cursor = conn.cursor()
-                search_term = f"%{keyword}%"
-                cursor.execute("""
-                    SELECT id, title, description, completed, 
-                           created_at, updated_at 
-                    FROM tasks 
-                    WHERE title LIKE ? OR description LIKE ?
-                    ORDER BY created_at DESC
-                """, (search_term, search_term))
 
-                return [dict(row) for row in cursor.fetchall()]
+                if not self.fts_enabled:
+                    search_term = f"%{keyword}%"
+                    cursor.execute("""
+                        SELECT id, title, description, completed, 
+                               created_at, updated_at 
+                        FROM tasks 
+                        WHERE title LIKE ? OR description LIKE ?
+                        ORDER BY created_at DESC
+                        LIMIT ? OFFSET ?
+                    """, (search_term, search_term, limit, offset))
+                    return [dict(row) for row in cursor.fetchall()]
+
+                query = self._fts_query(keyword)
+                if not query:
+                    return []
+
+                cursor.execute("""
+                    SELECT t.id, t.title, t.description, t.completed, 
+                           t.created_at, t.updated_at,
+                           highlight(tasks_fts, 0, ?, ?) AS title_highlight,
+                           snippet(tasks_fts, 1, ?, ?, '…', 12) AS snippet,
+                           tasks_fts.rank AS rank
+                    FROM tasks_fts 
+                    JOIN tasks t ON t.id = tasks_fts.rowid
+                    WHERE tasks_fts MATCH ?
+                    ORDER BY tasks_fts.rank
+                    LIMIT ? OFFSET ?
+                """, (MATCH_START, MATCH_END, MATCH_START, MATCH_END, query, limit, offset))
+
+                # Текст задач — пользовательский ввод: в HTML он попадает
+                # только экранированным, размечены лишь сами совпадения.
+                tasks = [dict(row) for row in cursor.fetchall()]
+                for task in tasks:
+                    task["title_highlight"] = mark_matches(task["title_highlight"])
+                    task["snippet"] = mark_matches(task["snippet"])
+                return tasks
         except sqlite3.Error as e:
             logger.error(f"Ошибка поиска задач: {e}")
             return []
 
     def toggle_task_completion(self, task_id: int) -> Optional[Dict[str, Any]]:
 
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-
-                cursor.execute("SELECT completed FROM tasks WHERE id = ?", (task_id,))
-                result = cursor.fetchone()
-
-                if not result:
-                    return None
+        def toggle(conn):
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE tasks 
+                SET completed = NOT completed, updated_at = CURRENT_TIMESTAMP 
+                WHERE id = ?
+                RETURNING id, title, description, completed, created_at, updated_at
+            """, (task_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None, None
+            task = dict(row)
+            return task, self._change_state(cursor)
 
-                new_status = 0 if result["completed"] else 1
-
-                cursor.execute("""
-                    UPDATE tasks 
-                    SET completed = ?, updated_at = CURRENT_TIMESTAMP 
-                    WHERE id = ?
-                """, (new_status, task_id))
-                conn.commit()
-
-                return self.get_task_by_id(task_id)
+        try:
+            task, state = self._execute_write(toggle)
         except sqlite3.Error as e:
             logger.error(f"Ошибка переключения статуса задачи {task_id}: {e}")
             return None
 
-db = Database()
\ No newline at end of file
+        if task:
+            self._notify([("updated", task)], state)
+        return task
+
+db = Database(os.environ.get("TODO_DB_PATH", "todo.db"))
\ No newline at end of file
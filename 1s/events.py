@@ -0,0 +1,48 @@
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+Event = Tuple[int, str, Dict[str, Any]]
+
+
+class ChangeFeed:
+    # Внутрипроцессная шина изменений задач. Последние capacity событий
+    # хранятся в кольцевом буфере, чтобы переподключившийся клиент мог
+    # дочитать пропущенное по Last-Event-ID.
+
+    def __init__(self, capacity: int = 1000):
+        self._events: Deque[Event] = deque(maxlen=capacity)
+        self._condition = threading.Condition()
+        self._last_id = 0
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> int:
+        with self._condition:
+            self._last_id += 1
+            self._events.append((self._last_id, event_type, data))
+            self._condition.notify_all()
+            return self._last_id
+
+    def since(self, last_id: int) -> Optional[List[Event]]:
+        # None означает разрыв: нужные события уже вытеснены из буфера
+        # (или id пришёл от другого процесса), клиенту нужна полная загрузка.
+        with self._condition:
+            return self._since(last_id)
+
+    def wait(self, last_id: int, timeout: float) -> Optional[List[Event]]:
+        with self._condition:
+            self._condition.wait_for(lambda: self._last_id != last_id, timeout)
+            return self._since(last_id)
+
+    def _since(self, last_id: int) -> Optional[List[Event]]:
+        if last_id > self._last_id:
+            return None
+        if last_id == self._last_id:
+            return []
+        if not self._events or self._events[0][0] > last_id + 1:
+            return None
+        start = last_id + 1 - self._events[0][0]
+        return [self._events[i] for i in range(start, len(self._events))]
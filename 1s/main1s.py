@@ -1,15 +1,58 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, g, has_request_context, request, jsonify, render_template, make_response
 from flask_cors import CORS
-from models import TaskCreate, TaskUpdate, TaskResponse
-from database import db
+from models import TaskCreate, TaskUpdate, TaskResponse, BulkOperation
+from database import db as task_db
+from cache import CachedDatabase, LRUCache
+from compression import init_compression
+from json_provider import FastJSONProvider
+from metrics import CallbackMetric, InstrumentedDatabase, instrument_app, registry
+from profiler import init_profiler
+from datetime import datetime, timezone
+from functools import wraps
+import click
+import csv
+import io
+import json
+import os
 import traceback
 
 app = Flask(__name__,
             static_folder='static',
             template_folder='templates')
 app.config['JSON_AS_ASCII'] = False
+app.json = FastJSONProvider(app)
 
 CORS(app, resources={r"/*": {"origins": "*"}})
+init_compression(app, min_size=int(os.environ.get('COMPRESS_MIN_SIZE', 1024)))
+instrument_app(app)
+init_profiler(app)
+
+
+def table_version():
+    # Версия, которую conditional_get уже прочитал для этого запроса; вне
+    # такого запроса (поток SSE, CLI) — из БД.
+    if has_request_context() and 'table_version' in g:
+        return g.table_version
+    return db.database.get_version()[0]
+
+
+# Метрики снимаются под кэшем, то есть считаются реальные обращения к SQLite.
+db = CachedDatabase(
+    InstrumentedDatabase(task_db),
+    LRUCache(max_bytes=int(os.environ.get('TODO_CACHE_MAX_BYTES', 64 * 1024 * 1024))),
+    ttl=float(os.environ.get('TODO_CACHE_TTL', 30)),
+    version=table_version
+)
+
+if os.environ.get('TODO_WRITE_BATCH_MS'):
+    task_db.enable_write_batching(
+        max_batch=int(os.environ.get('TODO_WRITE_BATCH_SIZE', 256)),
+        max_delay=float(os.environ['TODO_WRITE_BATCH_MS']) / 1000,
+        synchronous=os.environ.get('TODO_WRITE_BATCH_SYNCHRONOUS', 'NORMAL')
+    )
+
+registry.register(CallbackMetric('todo_cache_hits_total', 'Попадания в кэш задач', 'counter', lambda: db.hits))
+registry.register(CallbackMetric('todo_cache_misses_total', 'Промахи кэша задач', 'counter', lambda: db.misses))
 
 def validate_pydantic_error(error):
 
@@ -31,21 +74,185 @@ def task_to_response(task_dict):
     except Exception:
         return task_dict
 
+def conditional_get(view):
+    # ETag — версия таблицы tasks: пока она не изменилась, ответ с тем же
+    # URL тоже не изменился, и 304 отдаётся без запроса данных и сериализации.
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        version, modified_at = db.get_version()
+        g.table_version = version
+        etag = str(version)
+        last_modified = datetime.fromtimestamp(modified_at, timezone.utc)
+
+        if request.if_none_match:
+            # Слабое сравнение: сжатый ответ несёт W/-ETag той же версии.
+            not_modified = request.if_none_match.contains_weak(etag)
+        else:
+            since = request.if_modified_since
+            not_modified = since is not None and last_modified <= since
+
+        if not_modified:
+            response = app.response_class(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.cache_control.no_cache = True
+        return response
+
+    return wrapper
+
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
 @app.route('/tasks', methods=['GET'])
+@conditional_get
 def get_tasks():
 
     try:
-        tasks = db.get_all_tasks()
-        return jsonify(tasks)
+        if 'limit' not in request.args and 'cursor' not in request.args:
+            return Response(db.get_all_tasks_json(), mimetype='application/json')
+
+        # type=int в request.args.get молча подставил бы значение по
+        # умолчанию вместо нечислового limit, поэтому разбор явный.
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            limit = None
+        if limit is None or not 1 <= limit <= MAX_PAGE_SIZE:
+            return jsonify({'error': f'limit должен быть от 1 до {MAX_PAGE_SIZE}'}), 400
+
+        try:
+            tasks, next_cursor = db.list_tasks(limit, request.args.get('cursor') or None)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        return jsonify({
+            'tasks': tasks,
+            'next_cursor': next_cursor
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+EXPORT_COLUMNS = ['id', 'title', 'description', 'completed', 'created_at', 'updated_at']
+
+
+def export_ndjson(database):
+    # Строки приходят из SQLite уже в виде JSON.
+    for batch in database.iter_tasks_json():
+        yield ''.join(line + '\n' for line in batch)
+
+
+def export_csv(database):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+
+    for batch in database.iter_tasks():
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+EXPORT_FORMATS = {
+    'ndjson': (export_ndjson, 'application/x-ndjson'),
+    'csv': (export_csv, 'text/csv'),
+}
+
+
+@app.route('/tasks/export', methods=['GET'])
+def export_tasks():
+
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({
+            'error': 'Неизвестный формат',
+            'available_formats': list(EXPORT_FORMATS)
+        }), 400
+
+    encoder, mimetype = EXPORT_FORMATS[export_format]
+    return Response(
+        encoder(db),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=tasks.{export_format}'}
+    )
+
+
+SSE_KEEPALIVE_SECONDS = 15
+SSE_POLL_SECONDS = 1
+
+
+def format_sse(event_id, event_type, data):
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return f'id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n'
+
+
+@app.route('/tasks/events', methods=['GET'])
+def task_events():
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        cursor = int(last_event_id) if last_event_id else db.changes.last_id
+    except ValueError:
+        cursor = -1
+
+    def stream(cursor):
+        # Лента изменений видит только записи своего процесса. Записи других
+        # воркеров замечаются по версии таблицы (table_versions): если она
+        # обогнала последнее отправленное событие, клиент получает reset.
+        yield 'retry: 3000\n\n'
+        version = db.get_version()[0]
+        idle = 0.0
+        while True:
+            events = db.changes.wait(cursor, timeout=SSE_POLL_SECONDS)
+            if events is None:
+                # Пропущенные события уже вытеснены из буфера — клиент
+                # перечитывает список целиком.
+                cursor = db.changes.last_id
+                version = db.get_version()[0]
+                yield format_sse(cursor, 'reset', {'stats': db.get_stats()})
+                continue
+            if not events:
+                current = db.get_version()[0]
+                if current > version:
+                    version = current
+                    idle = 0.0
+                    yield format_sse(cursor, 'reset', {'stats': db.get_stats()})
+                    continue
+                idle += SSE_POLL_SECONDS
+                if idle >= SSE_KEEPALIVE_SECONDS:
+                    idle = 0.0
+                    yield ': keepalive\n\n'
+                continue
+            idle = 0.0
+            for event_id, event_type, data in events:
+                yield format_sse(event_id, event_type, data)
+                cursor = event_id
+                version = max(version, data.get('version', 0))
+
+    return Response(stream(cursor), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
 @app.route('/tasks/<int:task_id>', methods=['GET'])
+@conditional_get
 def get_task(task_id):
 
     try:
@@ -84,6 +291,74 @@ def create_task():
         return jsonify({'error': str(e)}), 500
 
 
+MAX_BULK_OPERATIONS = 50000
+
+
+def parse_bulk_operation(raw):
+
+    operation = BulkOperation(**raw)
+    if operation.op == 'create':
+        task_data = TaskCreate(**operation.data)
+        return operation.op, None, task_data.model_dump()
+
+    if operation.id is None:
+        raise ValueError('Для update и delete нужен id')
+
+    if operation.op == 'update':
+        update_data = TaskUpdate(**operation.data)
+        return operation.op, operation.id, update_data.model_dump(exclude_unset=True)
+
+    return operation.op, operation.id, {}
+
+
+@app.route('/tasks/bulk', methods=['POST'])
+def bulk_tasks():
+
+    try:
+        if not request.is_json:
+            return jsonify({'error': 'Content-Type должен быть application/json'}), 415
+
+        payload = request.json
+        if isinstance(payload, dict):
+            payload = payload.get('operations')
+        if not isinstance(payload, list):
+            return jsonify({'error': 'Ожидается массив операций'}), 400
+        if len(payload) > MAX_BULK_OPERATIONS:
+            return jsonify({'error': f'Не больше {MAX_BULK_OPERATIONS} операций за запрос'}), 413
+
+        results = [None] * len(payload)
+        operations = []
+        positions = []
+
+        for index, raw in enumerate(payload):
+            try:
+                if not isinstance(raw, dict):
+                    raise ValueError('Операция должна быть объектом')
+                operations.append(parse_bulk_operation(raw))
+                positions.append(index)
+            except Exception as e:
+                results[index] = {
+                    'index': index,
+                    'status': 400,
+                    'error': 'Ошибка валидации',
+                    'details': validate_pydantic_error(e) if hasattr(e, 'errors') else str(e)
+                }
+
+        if operations:
+            applied = db.bulk_apply(operations)
+            for index, (op, _, _), result in zip(positions, operations, applied):
+                results[index] = {'index': index, 'op': op, **result}
+
+        return jsonify({
+            'results': results,
+            'succeeded': sum(1 for r in results if r['status'] < 400),
+            'failed': sum(1 for r in results if r['status'] >= 400)
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/tasks/<int:task_id>', methods=['PUT'])
 def update_task(task_id):
 
@@ -160,14 +435,10 @@ def delete_task(task_id):
 
     try:
 
-        task = db.get_task_by_id(task_id)
+        task = db.delete_task(task_id)
         if not task:
             return jsonify({'error': 'Задача не найдена'}), 404
 
-        deleted = db.delete_task(task_id)
-        if not deleted:
-            return jsonify({'error': 'Ошибка удаления'}), 500
-
         return jsonify({
             'result': 'Задача удалена',
             'task': task
@@ -192,6 +463,7 @@ def delete_all_tasks():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/stats', methods=['GET'])
+@conditional_get
 def get_stats():
 
     try:
@@ -202,6 +474,7 @@ def get_stats():
 
 
 @app.route('/tasks/search', methods=['GET'])
+@conditional_get
 def search_tasks():
 
     try:
@@ -209,12 +482,23 @@ def search_tasks():
         if not keyword:
             return jsonify({'error': 'Необходим поисковый запрос'}), 400
 
-        tasks = db.search_tasks(keyword)
+        limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        offset = request.args.get('offset', 0, type=int)
+        if not 1 <= limit <= MAX_PAGE_SIZE or offset < 0:
+            return jsonify({'error': 'Некорректные параметры пагинации'}), 400
+
+        tasks = db.search_tasks(keyword, limit=limit, offset=offset)
         return jsonify(tasks)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+
+    return jsonify(db.stats())
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
 
@@ -224,7 +508,7 @@ def health_check():
         return jsonify({
             'status': 'healthy',
             'database': 'connected',
-            'timestamp': traceback.format_exc()
+            'timestamp': datetime.now(timezone.utc).isoformat()
         })
     except Exception as e:
         return jsonify({
@@ -233,6 +517,27 @@ def health_check():
             'error': str(e)
         }), 500
 
+@app.cli.command('init-db')
+def init_db_command():
+    # Миграции до старта воркеров, чтобы первый запрос их не ждал.
+    task_db.init_db()
+    click.echo(f'Схема БД {task_db.db_path} актуальна')
+
+
+@app.cli.command('seed-db')
+def seed_db_command():
+    added = task_db.seed_sample_data()
+    click.echo(f'Добавлено тестовых задач: {added}' if added else 'Таблица задач не пуста, данные не добавлены')
+
+
+@app.cli.command('recompute-stats')
+def recompute_stats_command():
+    # Пересчёт task_stats полным проходом по tasks — операция обслуживания,
+    # поэтому доступна только из CLI, а не по HTTP.
+    stats = task_db.recompute_stats()
+    click.echo(f"Статистика пересчитана: всего {stats['total']}, выполнено {stats['completed']}")
+
+
 @app.errorhandler(404)
 def not_found(e):
     return jsonify({'error': 'Эндпоинт не найден'}), 404
@@ -247,6 +552,7 @@ if __name__ == '__main__':
     print("=" * 50)
     print("🚀 Запуск Todo List приложения с SQLite")
     print("📁 База данных: todo.db")
+    print("🌱 Тестовые данные: flask --app main1s seed-db")
     print("🌐 API: http://localhost:2000/")
     print("🖥️  Интерфейс: http://localhost:2000/")
     print("=" * 50)
@@ -0,0 +1,259 @@
+import bisect
+import inspect
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+from flask import Flask, Response, g, request
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def escape_label(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names: Sequence[str], values: Sequence[Any], extra: str = '') -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    # Минимальная реализация метрик в текстовом формате Prometheus — без
+    # внешней зависимости. Значения меток передаются позиционно в порядке
+    # labelnames, что дешевле словаря на горячем пути.
+
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[Any, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f'{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}'
+            for labels, value in items
+        ]
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, *labels: Any, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def inc(self, *labels: Any, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: Any, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: Any, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+
+class CallbackMetric(Metric):
+    # Значение читается в момент выдачи /metrics (например, счётчик
+    # повторов SQLITE_BUSY, который ведёт сама Database).
+
+    def __init__(self, name: str, documentation: str, metric_type: str, callback: Callable[[], float]):
+        super().__init__(name, documentation)
+        self.type = metric_type
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        return self.header() + [f'{self.name} {format_value(self.callback())}']
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: Any):
+        # Хранятся попадания в отдельные корзины; накопительные суммы,
+        # которых требует формат, считаются только при выдаче.
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(labels, (list(state[0]), state[1], state[2])) for labels, state in self._values.items()]
+
+        lines = self.header()
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = 'le="' + ('+Inf' if bound == float('inf') else format_value(bound)) + '"'
+                lines.append(f'{self.name}_bucket{format_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{format_labels(self.labelnames, labels)} {format_value(total)}')
+            lines.append(f'{self.name}_count{format_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class Registry:
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return '\n'.join(line for metric in self._metrics for line in metric.render()) + '\n'
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    'todo_http_requests_total', 'Запросы по методу, маршруту и статусу', ('method', 'route', 'status')))
+HTTP_DURATION = registry.register(Histogram(
+    'todo_http_request_duration_seconds', 'Время обработки запроса', ('method', 'route')))
+HTTP_IN_FLIGHT = registry.register(Gauge(
+    'todo_http_requests_in_flight', 'Запросы в обработке', ('method', 'route')))
+DB_CALLS = registry.register(Counter(
+    'todo_db_calls_total', 'Вызовы методов Database', ('method',)))
+DB_ERRORS = registry.register(Counter(
+    'todo_db_errors_total', 'Вызовы методов Database, завершившиеся исключением', ('method',)))
+DB_DURATION = registry.register(Histogram(
+    'todo_db_call_duration_seconds', 'Время вызова метода Database', ('method',)))
+DB_ROWS = registry.register(Counter(
+    'todo_db_rows_returned_total', 'Строк возвращено методами Database', ('method',)))
+
+
+def route_label() -> str:
+    # Шаблон маршрута, а не фактический путь: /tasks/<int:task_id> вместо
+    # тысяч /tasks/1, /tasks/2, ... — иначе меток было бы неограниченно много.
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def instrument_app(app: Flask, path: str = '/metrics'):
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_labels = (request.method, route_label())
+        HTTP_IN_FLIGHT.inc(*g.metrics_labels)
+
+    @app.after_request
+    def record_request(response):
+        labels = g.get('metrics_labels')
+        if labels is not None:
+            HTTP_DURATION.observe(time.perf_counter() - g.metrics_start, *labels)
+            HTTP_REQUESTS.inc(*labels, response.status_code)
+        return response
+
+    @app.teardown_request
+    def finish_request(exc):
+        labels = g.pop('metrics_labels', None)
+        if labels is not None:
+            HTTP_IN_FLIGHT.dec(*labels)
+
+    @app.route(path, methods=['GET'])
+    def metrics():
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+
+def count_rows(result: Any) -> int:
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, tuple) and result and isinstance(result[0], list):
+        return len(result[0])
+    if isinstance(result, dict):
+        return len(result['tasks']) if isinstance(result.get('tasks'), list) else 1
+    return 0
+
+
+class InstrumentedDatabase:
+    # Прокси над Database: считает вызовы, время, ошибки и возвращённые
+    # строки по каждому публичному методу. Обёртка создаётся при первом
+    # обращении и кэшируется в экземпляре, так что дальше __getattr__ не
+    # вызывается. Генераторы (iter_tasks) замеряются до полного исчерпания.
+    # Выдача соединений из пула запросом не считается и не замеряется.
+
+    UNMEASURED = ('get_connection', 'connection')
+
+    def __init__(self, database):
+        self.database = database
+        registry.register(CallbackMetric(
+            'todo_sqlite_busy_retries_total', 'Повторы записи после SQLITE_BUSY/LOCKED',
+            'counter', lambda: database.busy_retries))
+        registry.register(CallbackMetric(
+            'todo_db_pool_connections', 'Открытые соединения пула', 'gauge', lambda: database.pool.size))
+
+    def __getattr__(self, name):
+        attr = getattr(self.database, name)
+        if name.startswith('_') or name in self.UNMEASURED or not callable(attr):
+            return attr
+
+        wrapped = self._wrap(name, attr)
+        setattr(self, name, wrapped)
+        return wrapped
+
+    @staticmethod
+    def _wrap(name: str, method: Callable):
+
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            except Exception:
+                DB_ERRORS.inc(name)
+                raise
+            finally:
+                DB_CALLS.inc(name)
+
+            if inspect.isgenerator(result):
+                return measure_generator(name, result, start)
+
+            DB_DURATION.observe(time.perf_counter() - start, name)
+            DB_ROWS.inc(name, amount=count_rows(result))
+            return result
+
+        return call
+
+
+def measure_generator(name: str, generator: Iterator[Any], start: float) -> Iterator[Any]:
+    rows = 0
+    try:
+        for batch in generator:
+            rows += len(batch) if isinstance(batch, list) else 1
+            yield batch
+    finally:
+        DB_DURATION.observe(time.perf_counter() - start, name)
+        DB_ROWS.inc(name, amount=rows)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, Literal, Dict, Any
 
 
 class TaskCreate(BaseModel):
@@ -15,6 +15,13 @@ class TaskUpdate(BaseModel):
     completed: Optional[bool] = None
 
 
+class BulkOperation(BaseModel):
+
+    op: Literal["create", "update", "delete"]
+    id: Optional[int] = None
+    data: Dict[str, Any] = Field(default_factory=dict)
+
+
 class TaskResponse(BaseModel):
 
     id: int
@@ -0,0 +1,182 @@
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, Optional, Set
+
+from flask import Flask, Response, g, jsonify, request
+
+TOKEN_HEADER = 'X-Profiler-Token'
+PROFILE_HEADER = 'X-Profile'
+MAX_SECONDS = 60
+DEFAULT_INTERVAL = 0.005
+
+# Листовые кадры потоков, которые просто ждут (блокировки, select, accept,
+# очередь): без include_idle такие стеки не попадают в профиль.
+IDLE_LEAVES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('selectors.py', 'select'),
+    ('socket.py', 'accept'),
+    ('socketserver.py', 'serve_forever'),
+    ('queue.py', 'get'),
+    ('thread.py', '_worker'),
+}
+
+CONTENT_TYPE = 'text/plain; charset=utf-8'
+
+_busy = threading.Lock()
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class StackSampler:
+    # Сэмплирующий профилировщик: раз в interval секунд снимает стеки всех
+    # потоков через sys._current_frames и считает одинаковые стеки. Результат —
+    # collapsed-формат («поток;кадр;кадр N»), который принимают flamegraph.pl
+    # и speedscope. Накладные расходы не зависят от числа вызовов в коде.
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, thread_ids: Optional[Iterable[int]] = None,
+                 include_idle: bool = False):
+        self.interval = interval
+        self.thread_ids: Optional[Set[int]] = set(thread_ids) if thread_ids is not None else None
+        self.include_idle = include_idle
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self, own: int):
+        names: Dict[int, str] = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (self.thread_ids is not None and ident not in self.thread_ids):
+                continue
+            code = frame.f_code
+            if not self.include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES:
+                continue
+
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            self._stacks[';'.join(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self, seconds: float) -> str:
+        own = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and not self._stop.is_set():
+            self._sample(own)
+            time.sleep(self.interval)
+        return self.collapsed()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, args=(MAX_SECONDS,), name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        return ''.join(f'{stack} {count}\n' for stack, count in self._stacks.most_common())
+
+
+def format_stats(profile: cProfile.Profile, limit: int = 60) -> str:
+    stream = io.StringIO()
+    pstats.Stats(profile, stream=stream).sort_stats('cumulative').print_stats(limit)
+    return stream.getvalue()
+
+
+def is_authorized(token: str) -> bool:
+    supplied = request.headers.get(TOKEN_HEADER, '')
+    return hmac.compare_digest(supplied.encode(), token.encode())
+
+
+def init_profiler(app: Flask, token: Optional[str] = None):
+    # Профилирование живого процесса без передеплоя. Включается только
+    # переменной PROFILER_TOKEN; без неё маршрута нет, заголовок игнорируется.
+    #   GET /debug/profile?seconds=N[&interval_ms=5][&idle=1] — сэмплы всех потоков;
+    #   заголовок X-Profile: sample | cprofile — профиль одного запроса вместо
+    #   его тела (исходный статус — в X-Profiled-Status).
+    token = token if token is not None else os.environ.get('PROFILER_TOKEN')
+    if not token:
+        return
+
+    @app.route('/debug/profile', methods=['GET'])
+    def debug_profile():
+        if not is_authorized(token):
+            return jsonify({'error': 'Доступ запрещён'}), 403
+
+        try:
+            seconds = float(request.args.get('seconds', 10))
+            interval = float(request.args.get('interval_ms', DEFAULT_INTERVAL * 1000)) / 1000
+        except ValueError:
+            return jsonify({'error': 'seconds и interval_ms должны быть числами'}), 400
+        if not 0 < seconds <= MAX_SECONDS or interval <= 0:
+            return jsonify({'error': f'seconds должен быть в диапазоне (0, {MAX_SECONDS}]'}), 400
+
+        if not _busy.acquire(blocking=False):
+            return jsonify({'error': 'Профилировщик занят'}), 409
+        try:
+            sampler = StackSampler(interval, include_idle=request.args.get('idle') in ('1', 'true'))
+            body = sampler.run(seconds)
+        finally:
+            _busy.release()
+
+        response = Response(body, content_type=CONTENT_TYPE)
+        response.headers['X-Profile-Samples'] = str(sampler.samples)
+        return response
+
+    @app.before_request
+    def start_request_profile():
+        mode = request.headers.get(PROFILE_HEADER)
+        if mode not in ('sample', 'cprofile') or not is_authorized(token):
+            return
+        if not _busy.acquire(blocking=False):
+            return jsonify({'error': 'Профилировщик занят'}), 409
+
+        if mode == 'sample':
+            profiler = StackSampler(interval=0.001, thread_ids=[threading.get_ident()], include_idle=True)
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        g.request_profiler = profiler
+
+    def collect(profiler) -> str:
+        try:
+            if isinstance(profiler, StackSampler):
+                return profiler.stop()
+            profiler.disable()
+            return format_stats(profiler)
+        finally:
+            _busy.release()
+
+    @app.after_request
+    def finish_request_profile(response):
+        profiler = g.pop('request_profiler', None)
+        if profiler is None:
+            return response
+
+        profiled = Response(collect(profiler), content_type=CONTENT_TYPE)
+        profiled.headers['X-Profiled-Status'] = str(response.status_code)
+        return profiled
+
+    @app.teardown_request
+    def abort_request_profile(exc):
+        # after_request не вызывается при необработанном исключении.
+        profiler = g.pop('request_profiler', None)
+        if profiler is not None:
+            collect(profiler)
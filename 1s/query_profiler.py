@@ -0,0 +1,211 @@
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("slow_query")
+
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDERS = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+def statement_shape(sql: str) -> str:
+    # Форма выражения: без лишних пробелов, а списки «?, ?, ?» разной
+    # длины (IN по пачке id) сводятся к одному виду.
+    return _PLACEHOLDERS.sub("?, ...", _WHITESPACE.sub(" ", sql).strip())
+
+
+def plan_flags(details: List[str]) -> List[str]:
+    # full_scan — SCAN таблицы без индекса, index_scan — обход всех строк
+    # в порядке индекса (LIKE-поиск с сортировкой по created_at, выгрузка
+    # всего списка), temp_btree — сортировка/группировка без подходящего
+    # индекса. Подзапросы, FTS и sqlite_master не учитываются.
+    flags = set()
+    for detail in details:
+        if (detail.startswith("SCAN ") and not detail.startswith("SCAN (")
+                and "VIRTUAL TABLE" not in detail
+                and detail not in ("SCAN CONSTANT ROW", "SCAN sqlite_master")):
+            flags.add("index_scan" if " USING " in detail else "full_scan")
+        if "USE TEMP B-TREE" in detail:
+            flags.add("temp_btree")
+    return sorted(flags)
+
+
+class QueryProfiler:
+    # Профилирование всех выражений Database: время (выполнение плюс
+    # выборка строк), число строк, накопленная статистика по формам
+    # выражений. Выражения дольше slow_ms пишутся в лог одной JSON-строкой;
+    # для каждой новой формы один раз снимается EXPLAIN QUERY PLAN.
+
+    def __init__(self, slow_ms: float = 100.0, explain: bool = True):
+        self.slow_ms = slow_ms
+        self.explain = explain
+        self.plans: Dict[str, Tuple[List[str], List[str]]] = {}
+        self._stats: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def capture_plan(self, conn: sqlite3.Connection, shape: str, sql: str, parameters: Any):
+        if not self.explain or shape in self.plans:
+            return
+        if not sql.lstrip().upper().startswith(EXPLAINABLE):
+            self.plans[shape] = ([], [])
+            return
+
+        try:
+            rows = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+        except sqlite3.Error:
+            # Ошибку покажет само выражение; план для формы больше не снимаем.
+            self.plans[shape] = ([], [])
+            return
+
+        details = [row[3] for row in rows]
+        flags = plan_flags(details)
+        self.plans[shape] = (details, flags)
+        if flags:
+            logger.warning(json.dumps({
+                "event": "query_plan",
+                "statement": shape,
+                "flags": flags,
+                "plan": details,
+            }, ensure_ascii=False))
+
+    def record(self, shape: str, elapsed: float, rows: int):
+        with self._lock:
+            stats = self._stats.get(shape)
+            if stats is None:
+                stats = self._stats[shape] = [0, 0.0, 0.0, 0]
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+            stats[3] += rows
+
+        duration_ms = elapsed * 1000
+        if duration_ms >= self.slow_ms:
+            logger.warning(json.dumps({
+                "event": "slow_query",
+                "duration_ms": round(duration_ms, 3),
+                "rows": rows,
+                "statement": shape,
+                "flags": self.plans.get(shape, ([], []))[1],
+                "thread": threading.current_thread().name,
+            }, ensure_ascii=False))
+
+    def report(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = [(shape, list(stats)) for shape, stats in self._stats.items()]
+
+        items.sort(key=lambda item: item[1][1], reverse=True)
+        return [{
+            "statement": shape,
+            "calls": calls,
+            "total_ms": round(total * 1000, 3),
+            "mean_ms": round(total * 1000 / calls, 3),
+            "max_ms": round(longest * 1000, 3),
+            "rows": rows,
+            "flags": self.plans.get(shape, ([], []))[1],
+        } for shape, (calls, total, longest, rows) in items[:limit]]
+
+
+class ProfilingCursor(sqlite3.Cursor):
+    # Время выражения складывается из execute и всех последующих fetch*.
+    # Запись завершается, когда строки кончились, при следующем execute,
+    # при закрытии курсора или при его сборке (conn.execute(...) без
+    # чтения результата).
+
+    _query: Optional[list] = None
+
+    def _begin(self, sql: str, parameters: Any, explain: bool):
+        self._finish()
+        profiler = self.connection.profiler
+        shape = statement_shape(sql)
+        if explain:
+            profiler.capture_plan(self.connection, shape, sql, parameters)
+        self._query = [shape, 0.0, 0]
+
+    def _finish(self):
+        query = self._query
+        if query is None:
+            return
+        self._query = None
+        rows = query[2] if query[2] or self.rowcount < 0 else self.rowcount
+        self.connection.profiler.record(query[0], query[1], rows)
+
+    def _timed(self, call, *args):
+        start = time.perf_counter()
+        try:
+            return call(*args)
+        finally:
+            if self._query is not None:
+                self._query[1] += time.perf_counter() - start
+
+    def execute(self, sql, parameters=()):
+        self._begin(sql, parameters, explain=True)
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._begin(sql, (), explain=False)
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        elif self._query is not None:
+            self._query[2] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, self.arraysize if size is None else size)
+        if not rows:
+            self._finish()
+        elif self._query is not None:
+            self._query[2] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        if self._query is not None:
+            self._query[2] += len(rows)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            row = self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+        if self._query is not None:
+            self._query[2] += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class ProfilingConnection(sqlite3.Connection):
+    # Фабрика соединений для пула: все курсоры — ProfilingCursor, включая
+    # неявные из conn.execute/executemany.
+
+    profiler: Optional[QueryProfiler] = None
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -16,13 +16,61 @@ const elements = {
     dbInfo: document.getElementById('db-info')
 };
 
+const PAGE_SIZE = 50;
+
 let currentTasks = [];
+let nextCursor = null;
 let isSearching = false;
+let liveUpdates = false;
 
 
 function init() {
     setupEventListeners();
     loadTasks();
+    subscribeToChanges();
+}
+
+function subscribeToChanges() {
+    if (!window.EventSource) return;
+
+    const source = new EventSource(`${API_BASE}/tasks/events`);
+
+    source.onopen = () => { liveUpdates = true; };
+    source.onerror = () => { liveUpdates = false; };
+
+    ['created', 'updated', 'deleted', 'reset'].forEach(type => {
+        source.addEventListener(type, event => applyChange(type, JSON.parse(event.data)));
+    });
+}
+
+async function refreshAfterMutation() {
+    if (!liveUpdates) {
+        await loadTasks();
+    }
+}
+
+function applyChange(type, change) {
+    if (change.stats) renderStats(change.stats);
+    if (isSearching) return;
+
+    if (type === 'reset') {
+        loadTasks();
+        return;
+    }
+
+    const index = currentTasks.findIndex(task => task.id === change.task.id);
+
+    if (type === 'deleted') {
+        if (index !== -1) currentTasks.splice(index, 1);
+    } else if (index !== -1) {
+        currentTasks[index] = change.task;
+    } else if (type === 'created') {
+        currentTasks.unshift(change.task);
+    } else {
+        return;
+    }
+
+    displayTasks(currentTasks);
 }
 
 function setupEventListeners() {
@@ -47,16 +95,26 @@ function setupEventListeners() {
     }
 }
 
+async function fetchTasksPage(cursor) {
+    const params = new URLSearchParams({ limit: PAGE_SIZE });
+    if (cursor) params.set('cursor', cursor);
+
+    const response = await fetch(`${API_BASE}/tasks?${params}`);
+
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    return response.json();
+}
+
 async function loadTasks() {
     try {
         showLoading();
-        const response = await fetch(`${API_BASE}/tasks`);
+        const page = await fetchTasksPage(null);
 
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-
-        currentTasks = await response.json();
+        currentTasks = page.tasks;
+        nextCursor = page.next_cursor;
         displayTasks(currentTasks);
         await loadStats();
 
@@ -66,24 +124,43 @@ async function loadTasks() {
     }
 }
 
+async function loadMoreTasks() {
+    if (!nextCursor) return;
+
+    try {
+        const page = await fetchTasksPage(nextCursor);
+
+        currentTasks = currentTasks.concat(page.tasks);
+        nextCursor = page.next_cursor;
+        displayTasks(currentTasks);
+
+    } catch (error) {
+        console.error('Ошибка загрузки задач:', error);
+        alert('Ошибка: ' + error.message);
+    }
+}
+
 async function loadStats() {
     try {
         const response = await fetch(`${API_BASE}/stats`);
         if (!response.ok) throw new Error('Ошибка загрузки статистики');
 
         const stats = await response.json();
-
-        elements.totalTasks.textContent = stats.total || 0;
-        elements.activeTasks.textContent = stats.active || 0;
-        elements.completedTasks.textContent = stats.completed || 0;
-        elements.completionRate.textContent =
-            stats.completion_rate ? `${Math.round(stats.completion_rate)}%` : '0%';
+        renderStats(stats);
 
     } catch (error) {
         console.error('Ошибка загрузки статистики:', error);
     }
 }
 
+function renderStats(stats) {
+    elements.totalTasks.textContent = stats.total || 0;
+    elements.activeTasks.textContent = stats.active || 0;
+    elements.completedTasks.textContent = stats.completed || 0;
+    elements.completionRate.textContent =
+        stats.completion_rate ? `${Math.round(stats.completion_rate)}%` : '0%';
+}
+
 
 function displayTasks(tasks) {
     if (!tasks || tasks.length === 0) {
@@ -143,6 +220,15 @@ function displayTasks(tasks) {
         </div>`;
     });
 
+    if (nextCursor && !isSearching) {
+        html += `
+        <div class="load-more">
+            <button class="btn btn-secondary" onclick="loadMoreTasks()">
+                <i class="fas fa-chevron-down"></i> Показать ещё
+            </button>
+        </div>`;
+    }
+
     elements.tasksContainer.innerHTML = html;
 }
 
@@ -202,7 +288,7 @@ async function addTask() {
         elements.titleChars.textContent = '0';
         elements.descChars.textContent = '0';
 
-        await loadTasks();
+        await refreshAfterMutation();
 
     } catch (error) {
         console.error('Ошибка создания задачи:', error);
@@ -220,7 +306,7 @@ async function toggleTask(id) {
             throw new Error('Ошибка при обновлении задачи');
         }
 
-        await loadTasks();
+        await refreshAfterMutation();
 
     } catch (error) {
         console.error('Ошибка переключения задачи:', error);
@@ -253,7 +339,7 @@ async function editTask(id) {
             })
         });
 
-        await loadTasks();
+        await refreshAfterMutation();
 
     } catch (error) {
         console.error('Ошибка редактирования задачи:', error);
@@ -273,7 +359,7 @@ async function deleteTask(id) {
 
         if (!response.ok) throw new Error('Ошибка при удалении');
 
-        await loadTasks();
+        await refreshAfterMutation();
 
     } catch (error) {
         console.error('Ошибка удаления задачи:', error);
@@ -293,7 +379,7 @@ async function clearAllTasks() {
 
         if (!response.ok) throw new Error('Ошибка при удалении');
 
-        await loadTasks();
+        await refreshAfterMutation();
 
     } catch (error) {
         console.error('Ошибка удаления всех задач:', error);
@@ -316,8 +402,8 @@ async function searchTasks() {
         if (!response.ok) throw new Error('Ошибка поиска');
 
         const tasks = await response.json();
-        displayTasks(tasks);
         isSearching = true;
+        displayTasks(tasks);
 
     } catch (error) {
         console.error('Ошибка поиска:', error);
@@ -361,6 +447,7 @@ function hideErrors() {
 }
 
 window.addTask = addTask;
+window.loadMoreTasks = loadMoreTasks;
 window.toggleTask = toggleTask;
 window.editTask = editTask;
 window.deleteTask = deleteTask;
@@ -0,0 +1,234 @@
+import logging
+import os
+import pickle
+import shutil
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("always", "everysec", "no")
+
+# Заголовок записи лога: длина и crc32 полезной нагрузки.
+_HEADER = struct.Struct(">II")
+
+
+class Journal:
+    # Долговечность для хранилища в памяти по схеме «снимок + журнал»:
+    # каждая операция записи дописывается в конец лога, а раз в
+    # snapshot_every операций состояние целиком сохраняется в компактный
+    # снимок (pickle), после чего старый лог удаляется. При старте
+    # загружается снимок и проигрываются записи лога с большим номером.
+    #
+    # fsync: always — после каждой записи; everysec — фоновым потоком раз в
+    # секунду (теряется не больше секунды при сбое ОС); no — только write
+    # в ОС, переживает падение процесса, но не питания.
+
+    def __init__(self, directory: str, name: str, fsync: str = "everysec",
+                 snapshot_every: int = 10000):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Неизвестная политика fsync: {fsync}")
+
+        self.directory = directory
+        self.fsync = fsync
+        self.snapshot_every = snapshot_every
+        self.snapshot_path = os.path.join(directory, f"{name}.snapshot")
+        self.log_path = os.path.join(directory, f"{name}.log")
+        self.old_log_path = self.log_path + ".old"
+        self.recovery_time: Optional[float] = None
+        # Было ли что восстанавливать (снимок или записи лога): по нему
+        # приложение отличает первый запуск от хранилища, опустошённого
+        # пользователем.
+        self.restored = False
+        self._seq = 0
+        self._since_snapshot = 0
+        self._file = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._syncer: Optional[threading.Thread] = None
+        self._compaction: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls, prefix: str, name: str) -> Optional["Journal"]:
+        # Персистентность включается только заданием каталога данных.
+        directory = os.environ.get(f"{prefix}DATA_DIR")
+        if not directory:
+            return None
+        return cls(
+            directory,
+            name,
+            fsync=os.environ.get(f"{prefix}FSYNC", "everysec"),
+            snapshot_every=int(os.environ.get(f"{prefix}SNAPSHOT_EVERY", 10000))
+        )
+
+    def recover(self, restore: Callable[[Any], None], apply: Callable[[Any], None],
+                capture: Callable[[], Any]) -> bool:
+        os.makedirs(self.directory, exist_ok=True)
+        start = time.perf_counter()
+
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "rb") as f:
+                self._seq, state = pickle.load(f)
+            restore(state)
+            self.restored = True
+
+        # Записи с номером не больше номера снимка уже в нём учтены — так
+        # бывает, если процесс упал между записью снимка и удалением лога.
+        replayed = 0
+        for path in (self.old_log_path, self.log_path):
+            for seq, op in self._read_log(path):
+                if seq <= self._seq:
+                    continue
+                apply(op)
+                self._seq = seq
+                replayed += 1
+        self.restored = self.restored or replayed > 0
+
+        self.recovery_time = time.perf_counter() - start
+        logger.info(f"Восстановлено состояние {os.path.basename(self.log_path)}: "
+                    f"{replayed} операций из лога за {self.recovery_time:.3f} с")
+
+        if replayed:
+            self._write_snapshot(self._seq, capture())
+        for path in (self.old_log_path, self.log_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+        self._file = open(self.log_path, "ab")
+        if self.fsync == "everysec":
+            self._syncer = threading.Thread(target=self._sync_loop, name="journal-fsync", daemon=True)
+            self._syncer.start()
+        return self.restored
+
+    def append(self, op: Any, capture: Callable[[], Any]):
+        # Вызывается под блокировкой записи хранилища, поэтому порядок
+        # записей в логе совпадает с порядком применения операций.
+        self._seq += 1
+        payload = pickle.dumps((self._seq, op), protocol=pickle.HIGHEST_PROTOCOL)
+
+        with self._lock:
+            self._file.write(_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+            self._file.flush()
+            if self.fsync == "always":
+                os.fsync(self._file.fileno())
+            else:
+                self._dirty = True
+
+        self._since_snapshot += 1
+        if (self.snapshot_every and self._since_snapshot >= self.snapshot_every
+                and not self._compacting()):
+            self._start_compaction(capture())
+
+    def sync(self):
+        with self._lock:
+            if not self._dirty or self._file is None:
+                return
+            self._dirty = False
+            fd = self._file.fileno()
+
+        # fsync вне блокировки, чтобы не задерживать запись. Если лог успели
+        # ротировать, старый файл уже синхронизирован при закрытии.
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+
+    def close(self):
+        self._closed.set()
+        if self._syncer is not None:
+            self._syncer.join()
+        if self._compaction is not None:
+            self._compaction.join()
+
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+    def _sync_loop(self):
+        while not self._closed.wait(1.0):
+            self.sync()
+
+    def _compacting(self) -> bool:
+        return self._compaction is not None and self._compaction.is_alive()
+
+    def _start_compaction(self, state: Any):
+        # Лог ротируется синхронно, а тяжёлая сериализация снимка идёт в
+        # фоне: state — поверхностная копия с неизменяемыми элементами.
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            if os.path.exists(self.old_log_path):
+                # Прошлый снимок не записался, и .old ещё нужен: текущий лог
+                # дописывается к нему, а не затирает его. Если процесс упадёт
+                # посередине, повторы отсеются по номерам записей.
+                with open(self.log_path, "rb") as current, open(self.old_log_path, "ab") as old:
+                    shutil.copyfileobj(current, old)
+                    old.flush()
+                    os.fsync(old.fileno())
+                os.remove(self.log_path)
+            else:
+                os.replace(self.log_path, self.old_log_path)
+            self._file = open(self.log_path, "ab")
+            self._dirty = False
+
+        self._since_snapshot = 0
+        self._compaction = threading.Thread(target=self._compact, args=(self._seq, state),
+                                            name="journal-snapshot", daemon=True)
+        self._compaction.start()
+
+    def _compact(self, seq: int, state: Any):
+        try:
+            self._write_snapshot(seq, state)
+            os.remove(self.old_log_path)
+        except OSError as e:
+            logger.error(f"Ошибка записи снимка: {e}")
+
+    def _write_snapshot(self, seq: int, state: Any):
+        start = time.perf_counter()
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((seq, state), f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        # На POSIX переименование становится долговечным после fsync каталога.
+        if hasattr(os, "O_DIRECTORY"):
+            fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        logger.info(f"Снимок {os.path.basename(self.snapshot_path)} записан "
+                    f"за {time.perf_counter() - start:.3f} с")
+
+    @staticmethod
+    def _read_log(path: str) -> Iterator[Tuple[int, Any]]:
+        if not os.path.exists(path):
+            return
+
+        with open(path, "rb") as f:
+            while True:
+                header = f.read(_HEADER.size)
+                if not header:
+                    return
+                if len(header) < _HEADER.size:
+                    break
+                length, checksum = _HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    break
+                yield pickle.loads(payload)
+
+        # Оборванная последняя запись — след сбоя во время write: всё, что
+        # было до неё, уже применено, остаток отбрасывается.
+        logger.warning(f"Лог {os.path.basename(path)} обрезан на повреждённой записи")
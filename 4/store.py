@@ -0,0 +1,199 @@
+import bisect
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from persistence import Journal
+
+
+class DuplicateEmailError(ValueError):
+    pass
+
+
+def email_key(email: Optional[str]) -> str:
+    return (email or '').strip().lower()
+
+
+def name_key(name: Optional[str]) -> str:
+    return (name or '').casefold()
+
+
+def field_text(value: Any) -> str:
+    # Поля пользователя — строки: JSON может прислать число или null, а
+    # индексы и сортировка рассчитаны только на str.
+    return '' if value is None else str(value)
+
+
+class UserStore:
+    # Пользователи в dict по id (порядок добавления сохраняется). Записи
+    # сериализуются блокировкой, dict пользователя после публикации не
+    # изменяется — update кладёт новый, — так что читать можно без блокировки.
+    #
+    # Вторичные индексы: уникальный по email (без учёта регистра; пустой
+    # email не индексируется и может повторяться) и отсортированный список
+    # (имя, id) для поиска по префиксу имени через bisect.
+
+    FIELDS = ('name', 'email', 'date')
+    SORT_FIELDS = ('id', 'name', 'email', 'date')
+
+    def __init__(self, journal: Optional[Journal] = None):
+        self._users: Dict[int, Dict[str, Any]] = {}
+        self._by_email: Dict[str, int] = {}
+        self._by_name: List[Tuple[str, int]] = []
+        self._next_id = 1
+        # Версия растёт при каждой записи; по ней сбрасываются отсортированные
+        # представления и кэш отрендеренных страниц.
+        self.version = 0
+        self._orders: Dict[str, Tuple[Dict[str, Any], ...]] = {}
+        self._lock = threading.Lock()
+        self._journal = None
+        if journal is not None:
+            journal.recover(self._restore, self._apply, self._capture)
+            self._journal = journal
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def _capture(self) -> Dict[str, Any]:
+        return {'next_id': self._next_id, 'users': tuple(self._users.values())}
+
+    def _restore(self, state: Dict[str, Any]):
+        self._users = {user['id']: user for user in state['users']}
+        self._next_id = max(self._next_id, state['next_id'])
+        self._by_email = {}
+        for user in self._users.values():
+            if email_key(user['email']):
+                self._by_email[email_key(user['email'])] = user['id']
+        self._by_name = sorted((name_key(user['name']), user['id']) for user in self._users.values())
+        self._changed()
+
+    def _apply(self, op: Tuple[Any, ...]):
+        # Журнал содержит только успешные записи, поэтому уникальность
+        # email при восстановлении не проверяется.
+        if op[0] == 'put':
+            self._put(op[1])
+            self._next_id = max(self._next_id, op[1]['id'] + 1)
+        elif op[0] == 'delete':
+            self._remove(op[1])
+
+    def _check_email(self, email: Optional[str], user_id: Optional[int] = None):
+        owner = self._by_email.get(email_key(email))
+        if owner is not None and owner != user_id:
+            raise DuplicateEmailError(f'Email {email} already exists')
+
+    def _changed(self):
+        self.version += 1
+        self._orders = {}
+
+    def _put(self, user: Dict[str, Any]):
+        # Ключи индексов считаются до изменения структур: ошибка здесь не
+        # должна оставить пользователя записанным наполовину.
+        email = email_key(user['email'])
+        name_entry = (name_key(user['name']), user['id'])
+        previous = self._users.get(user['id'])
+        if previous is not None:
+            self._unindex(previous)
+        self._users[user['id']] = user
+        if email:
+            self._by_email[email] = user['id']
+        bisect.insort(self._by_name, name_entry)
+        self._changed()
+
+    def _remove(self, user_id: int) -> Optional[Dict[str, Any]]:
+        user = self._users.pop(user_id, None)
+        if user is not None:
+            self._unindex(user)
+            self._changed()
+        return user
+
+    def _unindex(self, user: Dict[str, Any]):
+        if self._by_email.get(email_key(user['email'])) == user['id']:
+            del self._by_email[email_key(user['email'])]
+        entry = (name_key(user['name']), user['id'])
+        position = bisect.bisect_left(self._by_name, entry)
+        if position < len(self._by_name) and self._by_name[position] == entry:
+            del self._by_name[position]
+
+    def _log(self, *op):
+        if self._journal is not None:
+            self._journal.append(op, self._capture)
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+
+    def all(self) -> List[Dict[str, Any]]:
+        return list(self._users.values())
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        return self._users.get(user_id)
+
+    def find_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        user_id = self._by_email.get(email_key(email))
+        return self._users.get(user_id) if user_id is not None else None
+
+    def find_by_name_prefix(self, prefix: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        # Список имён сдвигается при вставке, поэтому обход — под блокировкой.
+        prefix = name_key(prefix)
+        result = []
+        with self._lock:
+            position = bisect.bisect_left(self._by_name, (prefix,))
+            while position < len(self._by_name) and (limit is None or len(result) < limit):
+                key, user_id = self._by_name[position]
+                if not key.startswith(prefix):
+                    break
+                result.append(self._users[user_id])
+                position += 1
+        return result
+
+    def ordered(self, sort: str = 'id') -> Tuple[Dict[str, Any], ...]:
+        # По id — порядок dict, по имени — готовый индекс; остальные поля
+        # сортируются один раз на версию хранилища.
+        with self._lock:
+            order = self._orders.get(sort)
+            if order is None:
+                if sort == 'id':
+                    order = tuple(self._users.values())
+                elif sort == 'name':
+                    order = tuple(self._users[user_id] for _, user_id in self._by_name)
+                else:
+                    order = tuple(sorted(self._users.values(),
+                                         key=lambda user: ((user[sort] or '').casefold(), user['id'])))
+                self._orders[sort] = order
+            return order
+
+    def page(self, sort: str = 'id', descending: bool = False,
+             offset: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+        order = self.ordered(sort)
+        if descending:
+            end = len(order) - offset
+            return list(reversed(order[max(end - limit, 0):max(end, 0)]))
+        return list(order[offset:offset + limit])
+
+    def add(self, name: str, email: str = '', date: str = '') -> Dict[str, Any]:
+        with self._lock:
+            user = {'id': self._next_id, 'name': field_text(name),
+                    'email': field_text(email), 'date': field_text(date)}
+            self._check_email(user['email'])
+            self._put(user)
+            self._next_id += 1
+            self._log('put', user)
+            return user
+
+    def update(self, user_id: int, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return None
+
+            updated = {**user, **{key: field_text(value) for key, value in fields.items() if key in self.FIELDS}}
+            self._check_email(updated['email'], user_id)
+            self._put(updated)
+            self._log('put', updated)
+            return updated
+
+    def delete(self, user_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            user = self._remove(user_id)
+            if user is not None:
+                self._log('delete', user_id)
+            return user
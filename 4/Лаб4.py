@@ -1,27 +1,99 @@
 from flask import Flask, render_template, request, jsonify, redirect, url_for
+from markupsafe import Markup
+import atexit
+import os
+import threading
+from compression import init_compression
+from persistence import Journal
+from profiler import init_profiler
+from store import DuplicateEmailError, UserStore
 
 app = Flask(__name__)
+init_compression(app, min_size=int(os.environ.get('COMPRESS_MIN_SIZE', 1024)))
+init_profiler(app)
 
-users_db = []
-next_id = 1
+# Без USERS_DATA_DIR пользователи живут только в памяти, как раньше.
+users_db = UserStore(journal=Journal.from_env('USERS_', 'users'))
+atexit.register(users_db.close)
+
+USERS_PER_PAGE = 50
+MAX_USERS_PER_PAGE = 500
+MAX_CACHED_TABLES = 256
+
+# Кэш отрендеренных таблиц: ключ содержит версию хранилища, поэтому любая
+# запись (добавление, правка, удаление) делает старые фрагменты недостижимыми,
+# а при смене версии кэш очищается целиком.
+table_cache = {}
+table_cache_version = None
+table_cache_lock = threading.Lock()
+
+
+def render_users_table(sort, order, page, per_page):
+
+    global table_cache, table_cache_version
+
+    version = users_db.version
+    key = (version, sort, order, page, per_page)
+    fragment = table_cache.get(key)
+    if fragment is not None:
+        return fragment
+
+    total = len(users_db)
+    pages = max((total + per_page - 1) // per_page, 1)
+    page = min(page, pages)
+    users = users_db.page(sort, order == 'desc', (page - 1) * per_page, per_page)
+
+    fragment = Markup(render_template(
+        '_users_table.html',
+        users=users, sort=sort, order=order,
+        page=page, pages=pages, per_page=per_page, total=total
+    ))
+
+    with table_cache_lock:
+        if table_cache_version != version or len(table_cache) >= MAX_CACHED_TABLES:
+            table_cache = {}
+            table_cache_version = version
+        table_cache[key] = fragment
+    return fragment
 
 
 @app.route('/', methods=['GET'])
 def index():
 
-    return render_template('index.html', users=users_db)
+    sort = request.args.get('sort', 'id')
+    if sort not in users_db.SORT_FIELDS:
+        sort = 'id'
+    order = 'desc' if request.args.get('order') == 'desc' else 'asc'
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', USERS_PER_PAGE, type=int), 1), MAX_USERS_PER_PAGE)
+
+    return render_template('index.html', users_table=render_users_table(sort, order, page, per_page))
 
 
 @app.route('/api/users', methods=['GET'])
 def get_users():
 
-    return jsonify(users_db)
+    # Поиск по email и префиксу имени идёт по индексам, без перебора.
+    email = request.args.get('email')
+    name_prefix = request.args.get('name_prefix')
+
+    if email is not None:
+        user = users_db.find_by_email(email)
+        users = [user] if user else []
+        if name_prefix is not None:
+            users = [u for u in users if u['name'].casefold().startswith(name_prefix.casefold())]
+        return jsonify(users)
+
+    if name_prefix is not None:
+        return jsonify(users_db.find_by_name_prefix(name_prefix))
+
+    return jsonify(users_db.all())
 
 
 @app.route('/api/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
 
-    user = next((u for u in users_db if u['id'] == user_id), None)
+    user = users_db.get(user_id)
     if user:
         return jsonify(user)
     return jsonify({'error': 'User not found'}), 404
@@ -30,27 +102,24 @@ def get_user(user_id):
 @app.route('/api/users', methods=['POST'])
 def create_user():
 
-    global next_id
-
     if not request.json or not 'name' in request.json:
         return jsonify({'error': 'Missing required fields'}), 400
 
-    user = {
-        'id': next_id,
-        'name': request.json['name'],
-        'email': request.json.get('email', ''),
-        'date': request.json.get('date', '')
-    }
-
-    users_db.append(user)
-    next_id += 1
+    try:
+        user = users_db.add(
+            request.json['name'],
+            request.json.get('email', ''),
+            request.json.get('date', '')
+        )
+    except DuplicateEmailError:
+        return jsonify({'error': 'Email already exists'}), 409
 
     return jsonify(user), 201
 
 
 @app.route('/api/users/<int:user_id>', methods=['PUT'])
 def update_user(user_id):
-    user = next((u for u in users_db if u['id'] == user_id), None)
+    user = users_db.get(user_id)
 
     if not user:
         return jsonify({'error': 'User not found'}), 404
@@ -58,9 +127,10 @@ def update_user(user_id):
     if not request.json:
         return jsonify({'error': 'No data provided'}), 400
 
-    user['name'] = request.json.get('name', user['name'])
-    user['email'] = request.json.get('email', user['email'])
-    user['date'] = request.json.get('date', user['date'])
+    try:
+        user = users_db.update(user_id, request.json)
+    except DuplicateEmailError:
+        return jsonify({'error': 'Email already exists'}), 409
 
     return jsonify(user)
 
@@ -68,15 +138,11 @@ def update_user(user_id):
 @app.route('/api/users/<int:user_id>', methods=['DELETE'])
 def delete_user(user_id):
 
-    global users_db
-
-    user = next((u for u in users_db if u['id'] == user_id), None)
+    user = users_db.delete(user_id)
 
     if not user:
         return jsonify({'error': 'User not found'}), 404
 
-    users_db = [u for u in users_db if u['id'] != user_id]
-
     return jsonify({'result': 'User deleted'}), 200
 
 
@@ -90,15 +156,10 @@ def add_user_form():
         date = request.form.get('date')
 
         if name:
-            global next_id
-            user = {
-                'id': next_id,
-                'name': name,
-                'email': email,
-                'date': date
-            }
-            users_db.append(user)
-            next_id += 1
+            try:
+                users_db.add(name, email, date)
+            except DuplicateEmailError:
+                return render_template('add_user.html', error='Пользователь с таким email уже есть'), 409
 
         return redirect(url_for('index'))
 
@@ -108,16 +169,22 @@ def add_user_form():
 @app.route('/edit/<int:user_id>', methods=['GET', 'POST'])
 def edit_user_form(user_id):
 
-    user = next((u for u in users_db if u['id'] == user_id), None)
+    user = users_db.get(user_id)
 
     if not user:
         return redirect(url_for('index'))
 
     if request.method == 'POST':
 
-        user['name'] = request.form.get('name', user['name'])
-        user['email'] = request.form.get('email', user['email'])
-        user['date'] = request.form.get('date', user['date'])
+        try:
+            users_db.update(user_id, {
+                'name': request.form.get('name', user['name']),
+                'email': request.form.get('email', user['email']),
+                'date': request.form.get('date', user['date'])
+            })
+        except DuplicateEmailError:
+            return render_template('edit_user.html', user=user,
+                                   error='Пользователь с таким email уже есть'), 409
 
         return redirect(url_for('index'))
 
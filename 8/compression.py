@@ -0,0 +1,80 @@
+import hashlib
+import os
+from typing import Callable, Dict, Set, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+STATIC_PREFIX = "/static/"
+SUFFIXES = (("br", ".br"), ("gzip", ".gz"))
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def accepted_encodings(header: str) -> Set[str]:
+    encodings = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if name and params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            encodings.add(name.lower())
+    return encodings
+
+
+class DynamicGZipMiddleware(GZipMiddleware):
+    # gzip для динамических ответов. Статика уже отдаётся сжатой
+    # (PrecompressedStaticFiles), и второй раз её не сжимаем.
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and scope["path"].startswith(STATIC_PREFIX):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    # Если рядом с файлом лежит предсжатый вариант (.br/.gz, собранный
+    # tools/precompress_static.py) и клиент его принимает — отдаётся он.
+    # URL с ?v=<хэш содержимого> кэшируются браузером надолго.
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+
+        if response.status_code == 200 and isinstance(response, FileResponse):
+            accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+            for encoding, suffix in SUFFIXES:
+                if encoding not in accepted:
+                    continue
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+                if stat_result is not None and stat_result.st_mtime >= os.stat(response.path).st_mtime:
+                    response = FileResponse(full_path, stat_result=stat_result,
+                                            media_type=response.media_type,
+                                            headers={"Content-Encoding": encoding})
+                    break
+
+        response.headers["Vary"] = "Accept-Encoding"
+        if b"v=" in scope.get("query_string", b""):
+            response.headers["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+        return response
+
+
+def static_url_factory(directory: str) -> Callable[[str], str]:
+    hashes: Dict[str, Tuple[float, str]] = {}
+
+    def static_url(filename: str) -> str:
+        path = os.path.join(directory, filename)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return STATIC_PREFIX + filename
+
+        cached = hashes.get(filename)
+        if cached is None or cached[0] != mtime:
+            with open(path, "rb") as f:
+                cached = (mtime, hashlib.sha256(f.read()).hexdigest()[:12])
+            hashes[filename] = cached
+        return f"{STATIC_PREFIX}{filename}?v={cached[1]}"
+
+    return static_url
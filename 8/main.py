@@ -1,19 +1,27 @@
 from fastapi import FastAPI, Request, Form
 from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from typing import Optional
+import os
 import uvicorn
 
+from compression import DynamicGZipMiddleware, PrecompressedStaticFiles, static_url_factory
+from profiler import init_profiler
+
 app = FastAPI(
     title="Simple FastAPI App",
     description="Простое приложение, которое принимает параметр и отвечает",
     version="1.0.0"
 )
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Профилировщик регистрируется до gzip, чтобы gzip оборачивал и его ответы.
+init_profiler(app)
+app.add_middleware(DynamicGZipMiddleware, minimum_size=int(os.environ.get("COMPRESS_MIN_SIZE", 1024)))
+
+app.mount("/static", PrecompressedStaticFiles(directory="static"), name="static")
 
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["static_url"] = static_url_factory("static")
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
@@ -1,6 +1,13 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, make_response
 from flask_cors import CORS
-from typing import List, Optional
+from functools import wraps
+import atexit
+import os
+from compression import init_compression
+from json_provider import FastJSONProvider, dumps
+from persistence import Journal
+from profiler import init_profiler
+from store import TaskStore
 
 try:
     from schemas import TaskCreate, TaskUpdate, TaskResponse
@@ -28,47 +35,52 @@ except ImportError:
 
 app = Flask(__name__, static_folder='static', template_folder='templates')
 app.config['JSON_AS_ASCII'] = False
+app.json = FastJSONProvider(app)
 
 CORS(app, resources={r"/*": {"origins": "*"}})
-
-class Task:
-    def __init__(self, id: int, title: str, description: str = "", completed: bool = False):
-        self.id = id
-        self.title = title
-        self.description = description
-        self.completed = completed
-
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'description': self.description,
-            'completed': self.completed
-        }
-
-tasks_db: List[Task] = []
-current_id = 1
-
-initial_tasks = [
-    Task(1, 'Изучить Python', 'Пройти курс по Python', True),
-    Task(2, 'Создать REST API', 'Написать простое API на Flask', False)
-]
-
-tasks_db.extend(initial_tasks)
-current_id = 3
-
-def find_task(task_id: int) -> Optional[Task]:
-    for task in tasks_db:
-        if task.id == task_id:
-            return task
-    return None
-
-
-def find_task_index(task_id: int) -> int:
-    for i, task in enumerate(tasks_db):
-        if task.id == task_id:
-            return i
-    return -1
+init_compression(app, min_size=int(os.environ.get('COMPRESS_MIN_SIZE', 1024)))
+init_profiler(app)
+
+# Без TASKS_8S_DATA_DIR задачи живут только в памяти, как раньше. Префикс
+# свой у каждого приложения, чтобы их журналы не смешивались в одном каталоге.
+tasks_db = TaskStore({'title': '', 'description': '', 'completed': False},
+                     journal=Journal.from_env('TASKS_8S_', 'tasks_8s'), dumps=dumps)
+atexit.register(tasks_db.close)
+
+# Примеры — только при первом запуске: если журнал что-то восстановил,
+# пустой список означает, что пользователь удалил задачи сам.
+if not tasks_db.restored and not len(tasks_db):
+    tasks_db.add(title='Изучить Python', description='Пройти курс по Python', completed=True)
+    tasks_db.add(title='Создать REST API', description='Написать простое API на Flask', completed=False)
+
+
+def conditional_get(view):
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        etag = str(tasks_db.version)
+        last_modified = tasks_db.modified_at
+
+        if request.if_none_match:
+            # Слабое сравнение: сжатый ответ несёт W/-ETag той же версии.
+            not_modified = request.if_none_match.contains_weak(etag)
+        else:
+            since = request.if_modified_since
+            not_modified = since is not None and last_modified <= since
+
+        if not_modified:
+            response = app.response_class(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.cache_control.no_cache = True
+        return response
+
+    return wrapper
 
 def validate_pydantic_error(error):
     errors = []
@@ -81,28 +93,27 @@ def validate_pydantic_error(error):
     return errors
 
 @app.route('/tasks', methods=['GET'])
+@conditional_get
 def get_tasks():
     try:
-        tasks_list = [task.to_dict() for task in tasks_db]
-        return jsonify(tasks_list)
+        return app.response_class(tasks_db.all_json(), mimetype='application/json')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/tasks/<int:task_id>', methods=['GET'])
+@conditional_get
 def get_task(task_id):
-    task = find_task(task_id)
+    task = tasks_db.get(task_id)
     if not task:
         return jsonify({'error': 'Task not found'}), 404
 
     try:
-        return jsonify(task.to_dict())
+        return jsonify(task)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/tasks', methods=['POST'])
 def create_task():
-    global current_id
-
     if not request.is_json:
         return jsonify({'error': 'Content-Type must be application/json'}), 415
 
@@ -114,22 +125,17 @@ def create_task():
             'details': validate_pydantic_error(e)
         }), 400
 
-    new_task = Task(
-        id=current_id,
+    new_task = tasks_db.add(
         title=task_data.title,
         description=task_data.description or "",
         completed=False
     )
 
-    tasks_db.append(new_task)
-    current_id += 1
-
-    return jsonify(new_task.to_dict()), 201
+    return jsonify(new_task), 201
 
 @app.route('/tasks/<int:task_id>', methods=['PUT'])
 def update_task(task_id):
-    task = find_task(task_id)
-    if not task:
+    if not tasks_db.get(task_id):
         return jsonify({'error': 'Task not found'}), 404
 
     if not request.is_json:
@@ -144,17 +150,15 @@ def update_task(task_id):
         }), 400
 
     update_dict = update_data.model_dump(exclude_unset=True)
+    task = tasks_db.update(task_id, update_dict)
+    if not task:
+        return jsonify({'error': 'Task not found'}), 404
 
-    for key, value in update_dict.items():
-        if hasattr(task, key):
-            setattr(task, key, value)
-
-    return jsonify(task.to_dict())
+    return jsonify(task)
 
 @app.route('/tasks/<int:task_id>', methods=['PATCH'])
 def patch_task(task_id):
-    task = find_task(task_id)
-    if not task:
+    if not tasks_db.get(task_id):
         return jsonify({'error': 'Task not found'}), 404
 
     if not request.is_json:
@@ -169,29 +173,26 @@ def patch_task(task_id):
         }), 400
 
     update_dict = update_data.model_dump(exclude_unset=True)
+    task = tasks_db.update(task_id, update_dict)
+    if not task:
+        return jsonify({'error': 'Task not found'}), 404
 
-    for key, value in update_dict.items():
-        if hasattr(task, key):
-            setattr(task, key, value)
-
-    return jsonify(task.to_dict())
+    return jsonify(task)
 
 @app.route('/tasks/<int:task_id>', methods=['DELETE'])
 def delete_task(task_id):
-    index = find_task_index(task_id)
-    if index == -1:
+    deleted_task = tasks_db.delete(task_id)
+    if not deleted_task:
         return jsonify({'error': 'Task not found'}), 404
 
-    deleted_task = tasks_db.pop(index)
     return jsonify({
         'result': 'Task deleted',
-        'task': deleted_task.to_dict()
+        'task': deleted_task
     })
 
 @app.route('/tasks', methods=['DELETE'])
 def delete_all_tasks():
-    deleted_tasks = [task.to_dict() for task in tasks_db]
-    tasks_db.clear()
+    deleted_tasks = tasks_db.clear()
     return jsonify({
         'result': 'All tasks deleted',
         'deleted_tasks': deleted_tasks,
@@ -199,19 +200,11 @@ def delete_all_tasks():
     })
 
 @app.route('/stats', methods=['GET'])
+@conditional_get
 def get_stats():
 
     try:
-        total = len(tasks_db)
-        completed = sum(1 for task in tasks_db if task.completed)
-        active = total - completed
-
-        return jsonify({
-            'total': total,
-            'completed': completed,
-            'active': active,
-            'completion_rate': (completed / total * 100) if total > 0 else 0
-        })
+        return jsonify(tasks_db.stats())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -0,0 +1,115 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+from typing import Dict, Optional, Tuple
+
+from flask import Flask, request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'text/javascript',
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'image/svg+xml',
+}
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_static_hashes: Dict[str, Tuple[float, str]] = {}
+
+
+def negotiate_encoding() -> Optional[str]:
+    available = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(available)
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    # Для ответов «на лету» — средние уровни сжатия: почти тот же размер,
+    # что на максимуме, за малую долю времени.
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def static_hash(static_folder: str, filename: str) -> Optional[str]:
+    path = safe_join(static_folder, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+
+    mtime = os.path.getmtime(path)
+    cached = _static_hashes.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'rb') as f:
+            cached = (mtime, hashlib.sha256(f.read()).hexdigest()[:12])
+        _static_hashes[path] = cached
+    return cached[1]
+
+
+def init_compression(app: Flask, min_size: int = 1024):
+    # Сжатие ответов по Accept-Encoding (brotli, если установлен, иначе
+    # gzip) для текстовых ответов от min_size байт. Потоковые ответы (SSE,
+    # выгрузка) и статика через send_file не трогаются.
+
+    @app.after_request
+    def compress_response(response):
+        if (response.direct_passthrough or response.is_streamed
+                or not 200 <= response.status_code < 300
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        body = response.get_data()
+        encoding = negotiate_encoding()
+        if len(body) < min_size or encoding is None:
+            return response
+
+        response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+        # Сжатое представление побайтно отличается от исходного — ETag
+        # становится слабым (сравнение If-None-Match при этом работает).
+        etag, _ = response.get_etag()
+        if etag:
+            response.set_etag(etag, weak=True)
+        return response
+
+    # Статика: URL из url_for получают ?v=<хэш содержимого> и кэшируются
+    # надолго; если рядом лежит предсжатый вариант (.br/.gz, см.
+    # tools/precompress_static.py), отдаётся он.
+
+    @app.url_defaults
+    def add_static_hash(endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            digest = static_hash(app.static_folder, values['filename'])
+            if digest:
+                values['v'] = digest
+
+    def send_static(filename):
+        response = None
+        encoding = negotiate_encoding()
+        path = safe_join(app.static_folder, filename)
+
+        if encoding is not None and path is not None and os.path.isfile(path):
+            compressed = path + SUFFIXES[encoding]
+            if os.path.isfile(compressed) and os.path.getmtime(compressed) >= os.path.getmtime(path):
+                mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                response = send_from_directory(app.static_folder, filename + SUFFIXES[encoding],
+                                               mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+
+        if response is None:
+            response = app.send_static_file(filename)
+
+        response.vary.add('Accept-Encoding')
+        if request.args.get('v'):
+            response.cache_control.no_cache = False
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = send_static
@@ -0,0 +1,191 @@
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from persistence import Journal
+
+Task = Dict[str, Any]
+
+
+def compact_dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+class TaskStore:
+    # Хранилище задач в памяти, общее для приложений 8s и 10: модуль
+    # копируется в каждое без изменений, как persistence.py. Задача — dict
+    # с id и полями из fields (имя поля → значение по умолчанию).
+    #
+    # dict по id сохраняет порядок добавления, а счётчик выполненных задач
+    # поддерживается при каждом изменении, так что поиск, удаление и
+    # статистика — O(1).
+    #
+    # Потокобезопасность: изменения и выдача id сериализуются блокировкой
+    # записи, читатели её не берут. Задача после публикации не изменяется —
+    # update кладёт новый dict, — поэтому читатель видит либо старую, либо
+    # новую версию задачи. Список для чтения — неизменяемый снимок,
+    # пересобираемый после записи.
+
+    def __init__(self, fields: Dict[str, Any], journal: Optional[Journal] = None,
+                 dumps: Callable[[Any], str] = compact_dumps):
+        self.fields = dict(fields)
+        self._dumps = dumps
+        self._tasks: Dict[int, Task] = {}
+        self._next_id = 1
+        self._write_lock = threading.Lock()
+        self._snapshot: Optional[Tuple[Task, ...]] = None
+        # JSON-фрагменты задач и склеенный из них список. Фрагмент хранится
+        # вместе с dict задачи и действителен, пока задача не заменена.
+        self._fragments: Dict[int, Tuple[Task, str]] = {}
+        self._json: Optional[Tuple[Tuple[Task, ...], str]] = None
+        self._completed = 0
+        # Версия для ETag начинается от текущего времени, чтобы после
+        # перезапуска не совпасть с ETag, сохранёнными клиентами.
+        self.version = int(time.time() * 1000)
+        self.modified_at = datetime.now(timezone.utc).replace(microsecond=0)
+        self._journal = None
+        self.restored = False
+        if journal is not None:
+            self.restored = journal.recover(self._restore, self._apply, self._capture)
+            self._completed = sum(1 for task in self._tasks.values() if task.get("completed"))
+            self._journal = journal
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    # Журнал хранит операции put/delete/clear над dict задач: формат на
+    # диске не зависит от модулей приложения, а повторное применение записи
+    # при восстановлении идемпотентно.
+
+    def _capture(self) -> Dict[str, Any]:
+        return {"next_id": self._next_id, "tasks": tuple(self._tasks.values())}
+
+    def _restore(self, state: Dict[str, Any]):
+        self._tasks = {task["id"]: task for task in state["tasks"]}
+        self._next_id = max(self._next_id, state["next_id"])
+
+    def _apply(self, op: Tuple[Any, ...]):
+        kind = op[0]
+        if kind == "put":
+            self._tasks[op[1]["id"]] = op[1]
+            self._next_id = max(self._next_id, op[1]["id"] + 1)
+        elif kind == "delete":
+            self._tasks.pop(op[1], None)
+        elif kind == "clear":
+            self._tasks.clear()
+
+    def _log(self, *op):
+        if self._journal is not None:
+            self._journal.append(op, self._capture)
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+
+    def _touch(self):
+        self._snapshot = None
+        self.version += 1
+        self.modified_at = datetime.now(timezone.utc).replace(microsecond=0)
+
+    def all(self) -> Tuple[Task, ...]:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._write_lock:
+                if self._snapshot is None:
+                    self._snapshot = tuple(self._tasks.values())
+                snapshot = self._snapshot
+        return snapshot
+
+    def all_json(self) -> str:
+        # После изменения одной задачи заново сериализуется только она,
+        # остальной список склеивается из готовых строк.
+        snapshot = self.all()
+        cached = self._json
+        if cached is not None and cached[0] is snapshot:
+            return cached[1]
+
+        parts = []
+        fresh = []
+        for task in snapshot:
+            entry = self._fragments.get(task["id"])
+            if entry is None or entry[0] is not task:
+                entry = (task, self._dumps(task))
+                fresh.append(entry)
+            parts.append(entry[1])
+
+        # Снимок мог устареть, пока шла сериализация: фрагмент сохраняется,
+        # только если задача всё ещё текущая, иначе гонка с delete или clear
+        # вернула бы в словарь фрагмент удалённой задачи навсегда.
+        if fresh:
+            with self._write_lock:
+                for entry in fresh:
+                    if self._tasks.get(entry[0]["id"]) is entry[0]:
+                        self._fragments[entry[0]["id"]] = entry
+
+        body = "[" + ",".join(parts) + "]"
+        self._json = (snapshot, body)
+        return body
+
+    def get(self, task_id: int) -> Optional[Task]:
+        return self._tasks.get(task_id)
+
+    def add(self, **values) -> Task:
+        with self._write_lock:
+            task = {"id": self._next_id,
+                    **{name: values.get(name, default) for name, default in self.fields.items()}}
+            self._next_id += 1
+            self._tasks[task["id"]] = task
+            if task.get("completed"):
+                self._completed += 1
+            self._log("put", task)
+            self._touch()
+        return task
+
+    def update(self, task_id: int, fields: Dict[str, Any]) -> Optional[Task]:
+        with self._write_lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return None
+
+            updated = {**task, **{key: value for key, value in fields.items() if key in self.fields}}
+            self._tasks[task_id] = updated
+            self._completed += bool(updated.get("completed")) - bool(task.get("completed"))
+            self._log("put", updated)
+            self._touch()
+            return updated
+
+    def delete(self, task_id: int) -> Optional[Task]:
+        with self._write_lock:
+            task = self._tasks.pop(task_id, None)
+            if task is None:
+                return None
+
+            if task.get("completed"):
+                self._completed -= 1
+            self._fragments.pop(task_id, None)
+            self._log("delete", task_id)
+            self._touch()
+            return task
+
+    def clear(self) -> List[Task]:
+        with self._write_lock:
+            deleted = list(self._tasks.values())
+            self._tasks.clear()
+            self._completed = 0
+            self._fragments.clear()
+            self._log("clear")
+            self._touch()
+            return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._write_lock:
+            total = len(self._tasks)
+            completed = self._completed
+        return {
+            "total": total,
+            "completed": completed,
+            "active": total - completed,
+            "completion_rate": (completed / total * 100) if total > 0 else 0
+        }
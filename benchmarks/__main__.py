@@ -0,0 +1,104 @@
+import argparse
+import json
+from typing import Any, Dict, Iterator, List, Tuple
+
+from benchmarks import micro, startup
+from benchmarks.apps import APPS
+from benchmarks.common import metadata, save_results
+from benchmarks.load import run_app
+
+# Для метрик со словом «ms»/«us»/«rss» рост — регрессия, для rps — улучшение.
+HIGHER_IS_BETTER = ('throughput_rps',)
+RUN_PARAMETERS = ('concurrency', 'duration', 'warmup', 'seed_count', 'calls', 'repeat', 'cpu_count')
+
+
+def flatten(data: Dict[str, Any], prefix: str = '') -> Iterator[Tuple[str, float]]:
+    for key, value in data.items():
+        path = f'{prefix}{key}'
+        if isinstance(value, dict):
+            yield from flatten(value, path + '.')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, value
+
+
+def compare(base_path: str, new_path: str, threshold: float) -> int:
+    with open(base_path, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+
+    print(f"База: {base['meta'].get('commit')}  новое: {new['meta'].get('commit')}")
+    for key in RUN_PARAMETERS:
+        if base['meta'].get(key) != new['meta'].get(key):
+            print(f"Внимание: разные параметры прогона, {key}: {base['meta'].get(key)} и {new['meta'].get(key)}")
+    base_values = dict(flatten({k: v for k, v in base.items() if k != 'meta'}))
+    regressions = 0
+    for path, value in flatten({k: v for k, v in new.items() if k != 'meta'}):
+        old = base_values.get(path)
+        if not old or path.endswith(('calls', 'requests')):
+            continue
+        change = (value - old) / old * 100
+        worse = -change if path.endswith(HIGHER_IS_BETTER) else change
+        mark = ''
+        if worse > threshold:
+            mark = '  <-- регрессия'
+            regressions += 1
+        print(f'{path:<60} {old:>12} -> {value:<12} {change:+7.1f}%{mark}')
+    return 1 if regressions else 0
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Нагрузочные тесты и микробенчмарки приложений')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    load = commands.add_parser('load', help='запустить приложения и нагрузить их смесями запросов')
+    load.add_argument('--apps', default=','.join(APPS), help=f"через запятую: {', '.join(APPS)}")
+    load.add_argument('--mixes', help='только эти смеси (через запятую)')
+    load.add_argument('--concurrency', type=int, default=8)
+    load.add_argument('--duration', type=float, default=10.0, help='секунд замера на смесь')
+    load.add_argument('--warmup', type=float, default=2.0, help='секунд прогрева без учёта')
+    load.add_argument('--seed-count', type=int, default=1000, help='записей до начала замера')
+    load.add_argument('--output', help='сохранить результаты в JSON-файл')
+
+    micro_parser = commands.add_parser('micro', help='микробенчмарки Database (1s)')
+    micro_parser.add_argument('--sizes', default='1000,100000,1000000')
+    micro_parser.add_argument('--calls', type=int, default=200, help='вызовов на операцию')
+    micro_parser.add_argument('--output', help='сохранить результаты в JSON-файл')
+
+    startup_parser = commands.add_parser('startup', help='время импорта и запуска приложений')
+    startup_parser.add_argument('--apps', default=','.join(APPS), help=f"через запятую: {', '.join(APPS)}")
+    startup_parser.add_argument('--repeat', type=int, default=5, help='запусков на замер (медиана)')
+    startup_parser.add_argument('--output', help='сохранить результаты в JSON-файл')
+
+    compare_parser = commands.add_parser('compare', help='сравнить два JSON с результатами')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=10.0, help='порог регрессии, %%')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare':
+        return compare(args.base, args.new, args.threshold)
+
+    if args.command == 'load':
+        mixes = args.mixes.split(',') if args.mixes else None
+        results = {'meta': metadata(concurrency=args.concurrency, duration=args.duration,
+                                    warmup=args.warmup, seed_count=args.seed_count), 'load': {}}
+        for name in args.apps.split(','):
+            results['load'][name] = run_app(APPS[name], mixes, args.concurrency, args.duration,
+                                            args.warmup, args.seed_count)
+    elif args.command == 'startup':
+        results = {'meta': metadata(repeat=args.repeat),
+                   'startup': startup.run([APPS[name] for name in args.apps.split(',')], args.repeat)}
+    else:
+        sizes = [int(size) for size in args.sizes.split(',')]
+        results = {'meta': metadata(calls=args.calls), 'micro': micro.run(sizes, args.calls)}
+
+    if args.output:
+        save_results(args.output, results)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
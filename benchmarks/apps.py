@@ -0,0 +1,222 @@
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.common import ROOT
+
+# Запрос сценария: (метод, путь, JSON-тело или None). Фабрика получает
+# генератор случайных чисел и список id, созданных во время прогона.
+Request = Tuple[str, str, Optional[Dict[str, Any]]]
+RequestFactory = Callable[[random.Random, List[int]], Request]
+Mix = List[Tuple[int, RequestFactory]]
+
+WORDS = ('купить', 'молоко', 'отчёт', 'python', 'flask', 'звонок', 'встреча', 'код', 'тест', 'релиз')
+
+
+def pick_id(rng: random.Random, ids: List[int]) -> int:
+    return rng.choice(ids) if ids else 1
+
+
+def phrase(rng: random.Random, words: int = 3) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+class AppSpec:
+    # Как запустить приложение и какими запросами его нагружать. Смеси,
+    # которые приложению не подходят (например, поиск в 10), не задаются.
+
+    def __init__(self, name: str, directory: str, command: List[str], ready_path: str,
+                 seed: RequestFactory, mixes: Dict[str, Mix], env: Optional[Dict[str, str]] = None,
+                 module: Optional[str] = None, uses_db_path: bool = False):
+        self.name = name
+        self.directory = directory
+        self.command = command
+        self.module = module
+        self.uses_db_path = uses_db_path
+        self.ready_path = ready_path
+        self.seed = seed
+        self.mixes = mixes
+        self.env = env or {}
+
+
+def flask_command(module: str) -> List[str]:
+    # Без отладчика и перезагрузчика: иначе замер включал бы их накладные
+    # расходы, а RSS — второй процесс.
+    return [sys.executable, '-m', 'flask', '--app', module, 'run',
+            '--port', '{port}', '--with-threads', '--no-reload', '--no-debugger']
+
+
+def uvicorn_command(module: str) -> List[str]:
+    return [sys.executable, '-m', 'uvicorn', f'{module}:app', '--port', '{port}', '--log-level', 'warning']
+
+
+def create_task(rng, ids):
+    return 'POST', '/tasks', {'title': phrase(rng), 'description': phrase(rng, 8)}
+
+
+def create_user(rng, ids):
+    name = rng.choice(WORDS).capitalize() + str(rng.randrange(10 ** 6))
+    return 'POST', '/api/users', {'name': name, 'email': f'{name.lower()}.{rng.randrange(10 ** 9)}@example.com'}
+
+
+def create_task_10(rng, ids):
+    return 'POST', '/api/tasks', {'title': phrase(rng)}
+
+
+APPS: Dict[str, AppSpec] = {
+    '1s': AppSpec(
+        '1s', '1s', flask_command('main1s'), '/health',
+        seed=create_task, module='main1s', uses_db_path=True,
+        mixes={
+            'list-heavy': [
+                (8, lambda rng, ids: ('GET', '/tasks?limit=50', None)),
+                (2, lambda rng, ids: ('GET', f'/tasks/{pick_id(rng, ids)}', None)),
+            ],
+            'write-heavy': [
+                (5, create_task),
+                (3, lambda rng, ids: ('PATCH', f'/tasks/{pick_id(rng, ids)}', {'completed': rng.random() < 0.5})),
+                (2, lambda rng, ids: ('POST', f'/tasks/{pick_id(rng, ids)}/toggle', None)),
+            ],
+            'search-heavy': [
+                (8, lambda rng, ids: ('GET', f'/tasks/search?q={rng.choice(WORDS)}', None)),
+                (2, lambda rng, ids: ('GET', '/tasks?limit=50', None)),
+            ],
+            'stats-polling': [
+                (9, lambda rng, ids: ('GET', '/stats', None)),
+                (1, create_task),
+            ],
+        },
+    ),
+    '8s': AppSpec(
+        '8s', '8s', flask_command('app8s'), '/stats',
+        seed=create_task, module='app8s',
+        mixes={
+            'list-heavy': [
+                (8, lambda rng, ids: ('GET', '/tasks', None)),
+                (2, lambda rng, ids: ('GET', f'/tasks/{pick_id(rng, ids)}', None)),
+            ],
+            'write-heavy': [
+                (5, create_task),
+                (5, lambda rng, ids: ('PATCH', f'/tasks/{pick_id(rng, ids)}', {'completed': rng.random() < 0.5})),
+            ],
+            'stats-polling': [
+                (9, lambda rng, ids: ('GET', '/stats', None)),
+                (1, create_task),
+            ],
+        },
+    ),
+    '4': AppSpec(
+        '4', '4', flask_command('Лаб4'), '/api/users',
+        seed=create_user, module='Лаб4',
+        mixes={
+            'list-heavy': [
+                (5, lambda rng, ids: ('GET', '/api/users', None)),
+                (5, lambda rng, ids: ('GET', f'/?page={rng.randrange(1, 20)}&sort=name', None)),
+            ],
+            'write-heavy': [
+                (7, create_user),
+                (3, lambda rng, ids: ('PUT', f'/api/users/{pick_id(rng, ids)}', {'date': '2024-01-01'})),
+            ],
+            'search-heavy': [
+                (7, lambda rng, ids: ('GET', f'/api/users?name_prefix={rng.choice(WORDS)[:2]}', None)),
+                (3, lambda rng, ids: ('GET', f'/api/users/{pick_id(rng, ids)}', None)),
+            ],
+        },
+    ),
+    '8': AppSpec(
+        '8', '8', uvicorn_command('main'), '/api/greet',
+        seed=lambda rng, ids: ('GET', '/api/greet', None), module='main',
+        mixes={
+            'api': [
+                (5, lambda rng, ids: ('GET', f'/api/greet?name={rng.choice(WORDS)}', None)),
+                (5, lambda rng, ids: ('GET', f'/api/calculate?a={rng.randrange(100)}&b={rng.randrange(1, 100)}'
+                                             f'&operation={rng.choice(("add", "subtract", "multiply", "divide"))}', None)),
+            ],
+        },
+    ),
+    '10': AppSpec(
+        '10', '10', uvicorn_command('main'), '/api/tasks',
+        seed=create_task_10, module='main',
+        mixes={
+            'list-heavy': [
+                (10, lambda rng, ids: ('GET', '/api/tasks', None)),
+            ],
+            'write-heavy': [
+                (5, create_task_10),
+                (5, lambda rng, ids: ('PUT', f'/api/tasks/{pick_id(rng, ids)}', {'completed': rng.random() < 0.5})),
+            ],
+        },
+    ),
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class RunningApp:
+    # Приложение в отдельном процессе на свободном порту. У 1s своя
+    # временная база (или переданная db_path), поэтому рабочая todo.db не
+    # затрагивается.
+
+    def __init__(self, spec: AppSpec, startup_timeout: float = 30.0, db_path: Optional[str] = None):
+        self.spec = spec
+        self.port = free_port()
+        self.base_url = f'http://127.0.0.1:{self.port}'
+        self._tmpdir = tempfile.TemporaryDirectory(prefix=f'bench_{spec.name}_')
+
+        env = {**os.environ, **spec.env,
+               'TODO_DB_PATH': db_path or os.path.join(self._tmpdir.name, 'todo.db')}
+        env.pop('FLASK_DEBUG', None)
+        command = [part.replace('{port}', str(self.port)) for part in spec.command]
+        self._stderr = open(os.path.join(self._tmpdir.name, 'stderr.log'), 'wb')
+        self.process = subprocess.Popen(command, cwd=ROOT / spec.directory, env=env,
+                                        stdout=subprocess.DEVNULL, stderr=self._stderr)
+        self._wait_ready(startup_timeout)
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def _wait_ready(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'{self.spec.name} завершился при старте:\n{self._stderr_tail()}')
+            try:
+                with urllib.request.urlopen(self.base_url + self.spec.ready_path, timeout=1):
+                    return
+            except (urllib.error.URLError, ConnectionError, OSError):
+                time.sleep(0.02)
+        self.stop()
+        raise RuntimeError(f'{self.spec.name} не ответил за {timeout} с')
+
+    def _stderr_tail(self) -> str:
+        with open(os.path.join(self._tmpdir.name, 'stderr.log'), 'rb') as f:
+            return f.read()[-2000:].decode(errors='replace')
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self._stderr.close()
+        self._tmpdir.cleanup()
+
+    def __enter__(self) -> 'RunningApp':
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,89 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Лабораторные независимы и содержат одноимённые модули (json_provider,
+# database, ...), поэтому каждое приложение импортируется со своим sys.path,
+# а модули предыдущего выгружаются.
+APP_MODULES = ('json_provider', 'database', 'events', 'cache', 'batcher',
+               'persistence', 'store', 'compression',
+               'metrics', 'profiler', 'query_profiler')
+
+
+def import_app(app_dir: str, module: str):
+    for name in APP_MODULES:
+        sys.modules.pop(name, None)
+    sys.path.insert(0, str(ROOT / app_dir))
+    try:
+        return __import__(module)
+    finally:
+        sys.path.pop(0)
+
+
+def measure(fn: Callable[[], object], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(q / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    # psutil, если установлен; иначе /proc (Linux). На прочих системах — None.
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except ImportError:
+        pass
+    except Exception:
+        return None
+
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(**extra: Any) -> Dict[str, Any]:
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        **extra,
+    }
+
+
+def save_results(path: str, results: Dict[str, Any]):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f'Результаты сохранены в {path}')
@@ -0,0 +1,79 @@
+import argparse
+import os
+import tempfile
+from typing import Dict, List
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from benchmarks.common import import_app, measure, metadata, save_results
+
+
+def bench_1s(size: int, repeat: int, workdir: str) -> Dict[str, float]:
+    database = import_app('1s', 'database')
+    provider = import_app('1s', 'json_provider')
+
+    db = database.Database(os.path.join(workdir, f'bench_{size}.db'))
+    db._write(lambda conn: conn.executemany(
+        "INSERT INTO tasks (title, description, completed) VALUES (?, ?, ?)",
+        ((f'Задача {i}', f'Описание задачи номер {i}', i % 3 == 0) for i in range(size))
+    ))
+
+    app = Flask(__name__)
+    stdlib, fast = DefaultJSONProvider(app), provider.FastJSONProvider(app)
+    try:
+        return {
+            'stdlib (Row -> dict -> json)': measure(lambda: stdlib.dumps(db.get_all_tasks()), repeat),
+            'orjson (Row -> dict -> orjson)': measure(lambda: fast.dumps(db.get_all_tasks()), repeat),
+            'sqlite json_object': measure(db.get_all_tasks_json, repeat),
+        }
+    finally:
+        db.close()
+
+
+def bench_8s(size: int, repeat: int) -> Dict[str, float]:
+    provider = import_app('8s', 'json_provider')
+    store = import_app('8s', 'store')
+
+    tasks_db = store.TaskStore({'title': '', 'description': '', 'completed': False}, dumps=provider.dumps)
+    for i in range(size):
+        tasks_db.add(title=f'Задача {i}', description=f'Описание задачи номер {i}', completed=i % 3 == 0)
+
+    def after_one_update():
+        tasks_db.update(1, {'completed': not tasks_db.get(1)['completed']})
+        return tasks_db.all_json()
+
+    app = Flask(__name__)
+    stdlib, fast = DefaultJSONProvider(app), provider.FastJSONProvider(app)
+    return {
+        'stdlib (list -> json)': measure(lambda: stdlib.dumps(list(tasks_db.all())), repeat),
+        'orjson (list -> orjson)': measure(lambda: fast.dumps(list(tasks_db.all())), repeat),
+        'fragments after one update': measure(after_one_update, repeat),
+        'fragments, unchanged list': measure(tasks_db.all_json, repeat),
+    }
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Сериализация списка задач в JSON: 1s и 8s')
+    parser.add_argument('--sizes', default='10000,100000', help='размеры списков через запятую')
+    parser.add_argument('--repeat', type=int, default=5, help='повторов на замер (берётся лучший)')
+    parser.add_argument('--output', help='сохранить результаты в JSON-файл')
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in (int(s) for s in args.sizes.split(',')):
+            for app_name, timings in (('1s', bench_1s(size, args.repeat, workdir)),
+                                      ('8s', bench_8s(size, args.repeat))):
+                results.setdefault(app_name, {})[size] = timings
+                baseline = next(iter(timings.values()))
+                print(f'\n{app_name}, {size} задач')
+                for name, seconds in timings.items():
+                    print(f'  {name:<34} {seconds * 1000:9.1f} мс  x{baseline / seconds:5.1f}')
+
+    if args.output:
+        save_results(args.output, {'meta': metadata(repeat=args.repeat), 'json': results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+import http.client
+import json
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+from benchmarks.apps import AppSpec, Mix, Request, RunningApp
+from benchmarks.common import percentile, rss_bytes
+
+
+class Client:
+    # Одно keep-alive соединение на поток нагрузки.
+
+    def __init__(self, port: int):
+        self.port = port
+        self.conn: Optional[http.client.HTTPConnection] = None
+
+    def send(self, request: Request):
+        method, path, body = request
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+
+        headers = {'Accept-Encoding': 'gzip'}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+
+        try:
+            self.conn.request(method, quote(path, safe='/?&=%'), body=payload, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+        except Exception:
+            self.close()
+            raise
+        return response.status, data, response.getheader('Content-Encoding')
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def created_id(method: str, status: int, data: bytes, encoding: Optional[str]) -> Optional[int]:
+    if method != 'POST' or status not in (200, 201) or encoding:
+        return None
+    try:
+        value = json.loads(data)
+    except ValueError:
+        return None
+    return value.get('id') if isinstance(value, dict) else None
+
+
+def seed(app: RunningApp, count: int, rng: random.Random) -> List[int]:
+    client = Client(app.port)
+    ids = []
+    try:
+        for _ in range(count):
+            request = app.spec.seed(rng, ids)
+            status, data, encoding = client.send(request)
+            new_id = created_id(request[0], status, data, encoding)
+            if new_id is not None:
+                ids.append(new_id)
+    finally:
+        client.close()
+    return ids
+
+
+class RssSampler(threading.Thread):
+
+    def __init__(self, pid: int, interval: float = 0.2):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = rss_bytes(pid)
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            value = rss_bytes(self.pid)
+            if value is not None and (self.peak is None or value > self.peak):
+                self.peak = value
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def megabytes(value: Optional[int]) -> Optional[float]:
+    return round(value / 1024 / 1024, 1) if value is not None else None
+
+
+def run_mix(app: RunningApp, mix: Mix, ids: List[int], concurrency: int,
+            duration: float, warmup: float, seed_value: int) -> Dict[str, Any]:
+    # Каждый поток шлёт запросы подряд (закрытая модель нагрузки); задержки
+    # за время прогрева не учитываются.
+    factories = [factory for _, factory in mix]
+    weights = [weight for weight, _ in mix]
+    start = time.monotonic()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+    latencies: List[List[float]] = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+
+    def worker(index: int):
+        # Свой поток случайных чисел у каждого потока, отличный от того, что
+        # использовался при наполнении (иначе повторились бы email и т.п.).
+        rng = random.Random(seed_value + 1 + index)
+        client = Client(app.port)
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    return
+                request = rng.choices(factories, weights)[0](rng, ids)
+                try:
+                    status, data, encoding = client.send(request)
+                except Exception:
+                    status, data, encoding = None, b'', None
+                finished = time.monotonic()
+
+                new_id = created_id(request[0], status, data, encoding) if status else None
+                if new_id is not None:
+                    ids.append(new_id)
+                if now >= measure_from:
+                    latencies[index].append(finished - now)
+                    if status is None or status >= 400:
+                        errors[index] += 1
+        finally:
+            client.close()
+
+    rss_start = rss_bytes(app.pid)
+    sampler = RssSampler(app.pid)
+    sampler.start()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sampler.stop()
+
+    values = sorted(value for chunk in latencies for value in chunk)
+    return {
+        'requests': len(values),
+        'errors': sum(errors),
+        'throughput_rps': round(len(values) / duration, 1),
+        'mean_ms': round(sum(values) / len(values) * 1000, 3) if values else None,
+        'p50_ms': round(percentile(values, 50) * 1000, 3),
+        'p95_ms': round(percentile(values, 95) * 1000, 3),
+        'p99_ms': round(percentile(values, 99) * 1000, 3),
+        'max_ms': round(values[-1] * 1000, 3) if values else None,
+        'rss_start_mb': megabytes(rss_start),
+        'rss_peak_mb': megabytes(sampler.peak),
+        'rss_end_mb': megabytes(rss_bytes(app.pid)),
+    }
+
+
+def run_app(spec: AppSpec, mixes: Optional[List[str]], concurrency: int, duration: float,
+            warmup: float, seed_count: int, seed_value: int = 42) -> Dict[str, Any]:
+    # Каждая смесь — на свежем экземпляре приложения, чтобы данные одной
+    # смеси (например, тысячи созданных задач) не искажали следующую.
+    results = {}
+    for mix_name, mix in spec.mixes.items():
+        if mixes and mix_name not in mixes:
+            continue
+        try:
+            with RunningApp(spec) as app:
+                ids = seed(app, seed_count, random.Random(seed_value))
+                results[mix_name] = run_mix(app, mix, ids, concurrency, duration, warmup, seed_value)
+        except RuntimeError as e:
+            # Приложение не запустилось (например, нет зависимости) — это
+            # фиксируется в результатах, остальные приложения меряются дальше.
+            summary = [line for line in str(e).splitlines() if line.strip()][-1]
+            results[mix_name] = {'error': summary}
+            print(f'  {spec.name:<3} {mix_name:<14} не запустилось: {summary}')
+            continue
+        print(f'  {spec.name:<3} {mix_name:<14} {format_result(results[mix_name])}')
+    return results
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    return (f"{result['throughput_rps']:>9.1f} rps  p50 {result['p50_ms']:>8.2f}  "
+            f"p95 {result['p95_ms']:>8.2f}  p99 {result['p99_ms']:>8.2f} ms  "
+            f"ошибок {result['errors']:<5} RSS {result['rss_peak_mb']} МБ")
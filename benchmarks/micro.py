@@ -0,0 +1,93 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict
+
+from benchmarks.common import import_app
+
+WORDS = ('купить', 'молоко', 'отчёт', 'python', 'flask', 'звонок', 'встреча', 'код', 'тест', 'релиз')
+POPULATE_CHUNK = 50000
+
+
+def populate(db, size: int, rng: random.Random):
+    # Строки вставляются пачками в одной транзакции на пачку — так же, как
+    # bulk_apply, но без разбора операций и возврата результатов.
+    def insert(rows):
+        db._write(lambda conn: conn.executemany(
+            "INSERT INTO tasks (title, description, completed) VALUES (?, ?, ?)", rows))
+
+    existing = db.get_stats()['total']
+    for start in range(existing, size, POPULATE_CHUNK):
+        insert([
+            (' '.join(rng.choice(WORDS) for _ in range(3)),
+             ' '.join(rng.choice(WORDS) for _ in range(10)),
+             rng.random() < 0.3)
+            for _ in range(min(POPULATE_CHUNK, size - start))
+        ])
+
+
+def timed(fn: Callable[[], Any], calls: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        'calls': calls,
+        'median_us': round(statistics.median(samples) * 1e6, 1),
+        'p95_us': round(samples[min(int(len(samples) * 0.95), len(samples) - 1)] * 1e6, 1),
+    }
+
+
+def bench_size(database_module, size: int, calls: int, workdir: str, seed_value: int = 42) -> Dict[str, Any]:
+    rng = random.Random(seed_value)
+    db = database_module.Database(os.path.join(workdir, f'micro_{size}.db'))
+    try:
+        start = time.perf_counter()
+        populate(db, size, rng)
+        populate_seconds = time.perf_counter() - start
+
+        ids = [rng.randrange(1, size + 1) for _ in range(calls)]
+        middle = db.list_tasks(1, None)[0][0] if size else None
+        page_cursor = database_module.encode_cursor(db.get_task_by_id(size // 2) or middle)
+        next_id = iter(ids)
+
+        # Полная выгрузка на миллионе строк занимает секунды — её вызываем реже.
+        full_calls = max(1, min(calls, 2_000_000 // max(size, 1)))
+
+        operations = {
+            'get_task_by_id': (lambda: db.get_task_by_id(next(next_id)), calls),
+            'list_tasks_first_page': (lambda: db.list_tasks(50, None), calls),
+            'list_tasks_middle_page': (lambda: db.list_tasks(50, page_cursor), calls),
+            'search_tasks': (lambda: db.search_tasks(rng.choice(WORDS), limit=50), calls),
+            'get_stats': (db.get_stats, calls),
+            'get_version': (db.get_version, calls),
+            'create_task': (lambda: db.create_task('benchmark', 'micro'), calls),
+            'toggle_task_completion': (lambda: db.toggle_task_completion(rng.randrange(1, size + 1)), calls),
+            'get_all_tasks_json': (db.get_all_tasks_json, full_calls),
+        }
+
+        results = {'populate_seconds': round(populate_seconds, 2)}
+        for name, (fn, count) in operations.items():
+            results[name] = timed(fn, count)
+        return results
+    finally:
+        db.close()
+
+
+def run(sizes, calls: int) -> Dict[str, Any]:
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='bench_micro_') as workdir:
+        database_module = import_app('1s', 'database')
+        for size in sizes:
+            print(f'  Database, {size} строк')
+            results[str(size)] = bench_size(database_module, size, calls, workdir)
+            for name, value in results[str(size)].items():
+                if isinstance(value, dict):
+                    print(f"    {name:<26} median {value['median_us']:>10.1f} мкс  p95 {value['p95_us']:>10.1f} мкс")
+                else:
+                    print(f'    {name:<26} {value}')
+    return results
@@ -0,0 +1,64 @@
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.apps import AppSpec, RunningApp
+from benchmarks.common import ROOT
+
+IMPORT_SNIPPET = 'import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)'
+
+
+def median_ms(samples: List[float]) -> float:
+    return round(statistics.median(samples) * 1000, 2)
+
+
+def import_seconds(spec: AppSpec, db_path: str) -> float:
+    # Импорт модуля приложения в чистом интерпретаторе — то, что повторяет
+    # каждый новый воркер до того, как начнёт принимать запросы.
+    env = {**os.environ, **spec.env, 'TODO_DB_PATH': db_path}
+    result = subprocess.run([sys.executable, '-c', IMPORT_SNIPPET.format(module=spec.module)],
+                            cwd=ROOT / spec.directory, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def boot_seconds(spec: AppSpec, db_path: str) -> float:
+    # От запуска процесса до первого успешного ответа на ready_path,
+    # включая ленивую инициализацию БД на этом запросе.
+    start = time.perf_counter()
+    with RunningApp(spec, db_path=db_path):
+        return time.perf_counter() - start
+
+
+def run_app(spec: AppSpec, repeat: int) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix=f'bench_startup_{spec.name}_') as workdir:
+        def fresh(i: int) -> str:
+            return os.path.join(workdir, f'fresh_{i}.db')
+
+        try:
+            result = {
+                'import_ms': median_ms([import_seconds(spec, fresh(i)) for i in range(repeat)]),
+                'boot_ms': median_ms([boot_seconds(spec, fresh(i)) for i in range(repeat)]),
+            }
+            if spec.uses_db_path:
+                # Перезапуск воркера над уже созданной БД: схема актуальна,
+                # DDL пропускается.
+                existing = os.path.join(workdir, 'existing.db')
+                boot_seconds(spec, existing)
+                result['boot_existing_db_ms'] = median_ms([boot_seconds(spec, existing) for _ in range(repeat)])
+        except RuntimeError as e:
+            summary = [line for line in str(e).splitlines() if line.strip()][-1]
+            print(f'  {spec.name:<3} не запустилось: {summary}')
+            return {'error': summary}
+
+    print(f'  {spec.name:<3} ' + '  '.join(f'{name} {value:>8.2f}' for name, value in result.items()))
+    return result
+
+
+def run(specs: List[AppSpec], repeat: int) -> Dict[str, Any]:
+    return {spec.name: run_app(spec, repeat) for spec in specs}
@@ -0,0 +1,71 @@
+import argparse
+import gzip
+from pathlib import Path
+from typing import Iterable, List
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_DIRS = ('1s', '4', '8', '8s', '10')
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.html', '.svg', '.json', '.txt'}
+
+
+def static_files(app_dirs: Iterable[str]) -> Iterable[Path]:
+    for app_dir in app_dirs:
+        static_dir = ROOT / app_dir / 'static'
+        if not static_dir.is_dir():
+            continue
+        for path in sorted(static_dir.rglob('*')):
+            if path.is_file() and path.suffix in COMPRESSIBLE_EXTENSIONS:
+                yield path
+
+
+def write_variant(path: Path, suffix: str, data: bytes) -> bool:
+    target = path.with_name(path.name + suffix)
+    if target.exists() and target.stat().st_mtime >= path.stat().st_mtime:
+        return False
+
+    # Вариант, который не меньше оригинала, бесполезен — удаляем старый.
+    if len(data) >= path.stat().st_size:
+        if target.exists():
+            target.unlink()
+        return False
+
+    target.write_bytes(data)
+    return True
+
+
+def precompress(path: Path, min_size: int) -> List[str]:
+    raw = path.read_bytes()
+    if len(raw) < min_size:
+        return []
+
+    # Сжатие один раз при сборке — поэтому максимальные уровни.
+    written = []
+    if write_variant(path, '.gz', gzip.compress(raw, compresslevel=9, mtime=0)):
+        written.append('.gz')
+    if brotli is not None and write_variant(path, '.br', brotli.compress(raw, quality=11)):
+        written.append('.br')
+    return written
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Предсжатие статики приложений в .gz и .br')
+    parser.add_argument('apps', nargs='*', default=list(APP_DIRS), help='каталоги приложений')
+    parser.add_argument('--min-size', type=int, default=256, help='не сжимать файлы меньше (байт)')
+    args = parser.parse_args(argv)
+
+    if brotli is None:
+        print('Модуль brotli не установлен — собираются только .gz')
+
+    for path in static_files(args.apps):
+        written = precompress(path, args.min_size)
+        if written:
+            print(f'{path.relative_to(ROOT)}: {", ".join(written)}')
+
+
+if __name__ == '__main__':
+    main()